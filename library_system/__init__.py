@@ -0,0 +1,10 @@
+# ระบบจัดการห้องสมุด: import ได้โดยไม่โหลด GUI (tkinter) หรือ unittest
+# GUI อยู่ใน library_system.gui, สถิติแบบขนานใน library_system.analytics และ benchmark ใน library_system.benchmark
+
+from .instrumentation import Instrumentation, instrumentation
+from .library import Library
+from .models import (AlreadyLoanedError, AlreadyReservedError, Book, CirculationResult, LibraryError, LibraryEvent,
+                     Loan, Member, MemberNotFoundError, NoActiveLoanError, NoReservationError, Publication,
+                     PublicationNotFoundError, ReservedForAnotherMemberError)
+from .records import RECORD_FIELDS, ImportReport, export_records, import_records
+from .storage import JournalStorage, LibraryStorage, LoanRow, SQLiteStorage
@@ -0,0 +1,204 @@
+import contextlib
+import json
+import mmap
+import multiprocessing
+import os
+import tempfile
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy ไม่บังคับ: analytics จะใช้ mmap + memoryview แทน (ช้ากว่าแต่ได้ผลเหมือนกัน)
+    np = None
+
+from .library import Library
+
+
+# Analytics - สถิติการยืมจากข้อมูลจำนวนมาก ในรูปแบบคอลัมน์ที่ memory-map ได้ และคำนวณแบบขนานหลาย process
+
+# คอลัมน์ของรายการยืม (หนึ่งไฟล์ต่อคอลัมน์ ชนิดตาม array typecode) และคอลัมน์ของสิ่งพิมพ์ (index ตามตำแหน่ง)
+ANALYTICS_LOAN_COLUMNS = {"loan_ordinal": "i", "due_ordinal": "i", "member": "i", "position": "i", "returned": "b"}
+ANALYTICS_PUBLICATION_COLUMNS = {"genre": "i", "author": "i"}
+# จำนวนเดือนนับจาก 1970-01 ของวันที่ ordinal (ใช้ค่าเดียวกับ numpy datetime64[M])
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def export_loan_columns(library: "Library", directory: str, chunk_size: int = 100_000) -> int:
+    # เขียนรายการยืมทั้งหมดเป็นไฟล์คอลัมน์ใน directory ทีละ chunk (ไม่ต้องโหลดทั้งหมดเข้าหน่วยความจำ)
+    # คืนจำนวนรายการยืม
+    os.makedirs(directory, exist_ok=True)
+    member_ids: Dict[str, int] = {}
+    count = 0
+    with contextlib.ExitStack() as stack:
+        files = {name: stack.enter_context(open(os.path.join(directory, f"{name}.bin"), "wb"))
+                 for name in ANALYTICS_LOAN_COLUMNS}
+        buffers = {name: array(code) for name, code in ANALYTICS_LOAN_COLUMNS.items()}
+        
+        def write_buffers():
+            for name, buffer in buffers.items():
+                buffer.tofile(files[name])
+                del buffer[:]
+        
+        for member_id, position, loan_ordinal, due_ordinal, returned in library._iter_loan_ordinals():
+            buffers["loan_ordinal"].append(loan_ordinal)
+            buffers["due_ordinal"].append(due_ordinal)
+            buffers["member"].append(member_ids.setdefault(member_id, len(member_ids)))
+            buffers["position"].append(position)
+            buffers["returned"].append(returned)
+            count += 1
+            if len(buffers["position"]) >= chunk_size:
+                write_buffers()
+        write_buffers()
+    
+    # ประเภทและผู้แต่งเก็บเป็นรหัสตัวเลขต่อสิ่งพิมพ์ ชื่อจริงอยู่ใน meta.json
+    genres: Dict[str, int] = {}
+    authors: Dict[str, int] = {}
+    publication_columns = {name: array(code) for name, code in ANALYTICS_PUBLICATION_COLUMNS.items()}
+    for publication in library.publications:
+        publication_columns["genre"].append(genres.setdefault(getattr(publication, "genre", None) or "", len(genres)))
+        publication_columns["author"].append(authors.setdefault(publication.author, len(authors)))
+    for name, column in publication_columns.items():
+        with open(os.path.join(directory, f"publication_{name}.bin"), "wb") as f:
+            column.tofile(f)
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": count, "members": list(member_ids), "genres": list(genres),
+                   "authors": list(authors)}, f, ensure_ascii=False)
+    return count
+
+
+def _map_column(directory: str, name: str, code: str, start: int = 0, stop: Optional[int] = None):
+    # เปิดคอลัมน์แบบ memory-map โดยไม่อ่านทั้งไฟล์ (NumPy: np.memmap, ไม่มี NumPy: memoryview บน mmap)
+    path = os.path.join(directory, f"{name}.bin")
+    if np is not None:
+        return np.memmap(path, dtype=np.dtype(code), mode="r")[start:stop]
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(array(code))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped).cast(code)[start:stop]
+
+
+def _aggregate_loan_chunk(directory: str, start: int, stop: int, as_of_ordinal: int) -> Dict[str, Any]:
+    # คำนวณผลรวมย่อยของรายการยืมลำดับ start..stop-1 (รันใน worker process)
+    columns = {name: _map_column(directory, name, code, start, stop) for name, code in ANALYTICS_LOAN_COLUMNS.items()}
+    genre_of = _map_column(directory, "publication_genre", "i")
+    author_of = _map_column(directory, "publication_author", "i")
+    loan, due, positions, returned = columns["loan_ordinal"], columns["due_ordinal"], columns["position"], columns["returned"]
+    
+    if np is not None:
+        months = (loan.astype(np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        month_keys, month_counts = np.unique(months, return_counts=True)
+        genre_counts = np.bincount(genre_of[positions], minlength=len(genre_of) and int(genre_of.max()) + 1)
+        author_counts = np.bincount(author_of[positions], minlength=len(author_of) and int(author_of.max()) + 1)
+        is_open = returned == 0
+        return {
+            "count": int(stop - start),
+            "months": dict(zip(month_keys.tolist(), month_counts.tolist())),
+            "genres": {i: int(c) for i, c in enumerate(genre_counts.tolist()) if c},
+            "authors": {i: int(c) for i, c in enumerate(author_counts.tolist()) if c},
+            "duration_days": int((due.astype(np.int64) - loan).sum()),
+            "open": int(np.count_nonzero(is_open)),
+            "overdue": int(np.count_nonzero(is_open & (due < as_of_ordinal))),
+        }
+    
+    month_of: Dict[int, int] = {}
+    months: Counter = Counter()
+    for ordinal in loan:
+        month = month_of.get(ordinal)
+        if month is None:
+            day = date.fromordinal(ordinal)
+            month = month_of[ordinal] = (day.year - 1970) * 12 + day.month - 1
+        months[month] += 1
+    genres = Counter(genre_of[p] for p in positions)
+    authors = Counter(author_of[p] for p in positions)
+    open_due = [d for d, r in zip(due, returned) if not r]
+    return {
+        "count": stop - start,
+        "months": dict(months),
+        "genres": dict(genres),
+        "authors": dict(authors),
+        "duration_days": sum(due) - sum(loan),
+        "open": len(open_due),
+        "overdue": sum(1 for d in open_due if d < as_of_ordinal),
+    }
+
+
+class LoanStatistics:
+    def __init__(self, as_of: date):
+        self.as_of = as_of
+        self.total = 0
+        self.borrows_by_month: Dict[str, int] = {}
+        self.borrows_by_genre: Dict[str, int] = {}
+        self.borrows_by_author: Dict[str, int] = {}
+        # ระยะเวลายืมเฉลี่ยคิดจากวันยืมถึงวันกำหนดคืน (ระบบไม่ได้บันทึกวันที่คืนจริง)
+        self.average_loan_days = 0.0
+        self.open = 0
+        self.overdue = 0
+
+    @property
+    def overdue_rate(self) -> float:
+        # สัดส่วนของรายการที่ยังไม่คืนซึ่งเลยกำหนดแล้ว ณ วันที่ as_of
+        return self.overdue / self.open if self.open else 0.0
+
+    def rows(self) -> List[Tuple[str, str, Any]]:
+        # แถวสำหรับแสดงในตาราง: (หมวด, รายการ, ค่า)
+        rows: List[Tuple[str, str, Any]] = [
+            ("Summary", "Total loans", self.total),
+            ("Summary", "Average loan period (days)", round(self.average_loan_days, 1)),
+            ("Summary", "Open loans", self.open),
+            ("Summary", f"Overdue as of {self.as_of.isoformat()}", self.overdue),
+            ("Summary", "Overdue rate", f"{self.overdue_rate:.1%}"),
+        ]
+        rows += [("Month", month, count) for month, count in sorted(self.borrows_by_month.items())]
+        for section, counts in (("Genre", self.borrows_by_genre), ("Author", self.borrows_by_author)):
+            rows += [(section, name, count) for name, count in sorted(counts.items(), key=lambda kv: -kv[1])]
+        return rows
+
+
+def compute_loan_statistics(directory: str, as_of: Optional[date] = None, workers: Optional[int] = None,
+                            chunk_size: int = 2_000_000) -> LoanStatistics:
+    # แบ่งข้อมูลที่ export ไว้เป็นช่วงละ chunk_size แล้วคำนวณแต่ละช่วงใน process pool
+    # worker แต่ละตัวเปิดไฟล์เองแบบ memory-map จึงส่งแค่ path และช่วงข้ามไปยัง process
+    as_of = as_of or date.today()
+    with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    total = meta["count"]
+    ranges = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+    args = [(directory, start, stop, as_of.toordinal()) for start, stop in ranges]
+    if len(args) <= 1 or workers == 1:
+        partials = [_aggregate_loan_chunk(*arg) for arg in args]
+    else:
+        # ใช้ spawn เพื่อไม่ fork process ที่มีหลาย thread (เช่น GUI)
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            partials = list(pool.map(_aggregate_loan_chunk, *zip(*args)))
+    
+    statistics = LoanStatistics(as_of)
+    months: Counter = Counter()
+    genres: Counter = Counter()
+    authors: Counter = Counter()
+    duration_days = 0
+    for partial in partials:
+        statistics.total += partial["count"]
+        statistics.open += partial["open"]
+        statistics.overdue += partial["overdue"]
+        duration_days += partial["duration_days"]
+        months.update(partial["months"])
+        genres.update(partial["genres"])
+        authors.update(partial["authors"])
+    statistics.borrows_by_month = {f"{1970 + m // 12}-{m % 12 + 1:02d}": c for m, c in sorted(months.items())}
+    statistics.borrows_by_genre = {meta["genres"][i] or "(none)": c for i, c in genres.items()}
+    statistics.borrows_by_author = {meta["authors"][i]: c for i, c in authors.items()}
+    statistics.average_loan_days = duration_days / statistics.total if statistics.total else 0.0
+    return statistics
+
+
+def analyze_loans(library: "Library", as_of: Optional[date] = None, workers: Optional[int] = None) -> LoanStatistics:
+    # export ลงไดเรกทอรีชั่วคราวแล้วคำนวณสถิติ (ไฟล์ถูกลบเมื่อเสร็จ)
+    with tempfile.TemporaryDirectory() as directory:
+        export_loan_columns(library, directory)
+        return compute_loan_statistics(directory, as_of, workers)
@@ -0,0 +1,229 @@
+import contextlib
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .library import Library
+from .models import Book, Loan, Member
+
+
+# Memory Benchmark - วัดขนาดหน่วยความจำต่อ record
+
+# class แบบเดิมก่อนใช้ __slots__ (มี __dict__ และกำหนด attributes ใน __init__ เหมือนเดิม ใช้เปรียบเทียบเท่านั้น)
+# ต้องกำหนด attributes ทีละตัวใน __init__ เพื่อให้ Python ใช้ key-sharing dict เหมือน class เดิม
+
+class _DictMember:
+    def __init__(self, member_id: str, name: str, contact_info: str):
+        self.member_id = member_id
+        self.name = name
+        self.contact_info = contact_info
+        self.update_history: List[str] = []
+
+
+class _DictPublication:
+    def __init__(self, title: str, author: str, year: int):
+        self.title = title
+        self.author = author
+        self.year = year
+
+
+class _DictBook(_DictPublication):
+    def __init__(self, title: str, author: str, year: int, ISBN: str, genre: str):
+        super().__init__(title, author, year)
+        self.ISBN = ISBN
+        self.genre = genre
+
+
+class _DictLoan:
+    def __init__(self, member: Any, publication: Any, loan_date: str, due_date: str):
+        self.member = member
+        self.publication = publication
+        self.loan_date = loan_date
+        self.due_date = due_date
+        self.returned = False
+
+
+def _bytes_per_record(factory: Callable[[int], Any], count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # ไม่นับขนาดของ list ที่ใช้เก็บ records
+    return (after - before - sys.getsizeof(records)) / count
+
+
+def benchmark_memory(count: int = 100_000) -> Dict[str, Tuple[float, float]]:
+    # คืน {ชื่อ record: (bytes ต่อ record แบบเดิม, bytes ต่อ record แบบปัจจุบัน)}
+    # ข้อความ (ชื่อ, ISBN ฯลฯ) ใช้ object ร่วมกันทั้งสองแบบ จึงวัดเฉพาะส่วนที่เป็นโครงสร้างของ record
+    member = Member("M0", "Member", "contact")
+    book = Book("Title", "Author", 2000, "0", "Genre")
+    return {
+        "Member": (
+            _bytes_per_record(lambda i: _DictMember("M0", "Member", "contact"), count),
+            _bytes_per_record(lambda i: Member("M0", "Member", "contact"), count),
+        ),
+        "Book": (
+            _bytes_per_record(lambda i: _DictBook("Title", "Author", 2000, "0", "Genre"), count),
+            _bytes_per_record(lambda i: Book("Title", "Author", 2000, "0", "Genre"), count),
+        ),
+        "Loan": (
+            # ทั้งสองแบบเก็บวันที่เป็น string ใหม่ทุกครั้ง (เช่น จาก strftime หรือการนำเข้า)
+            _bytes_per_record(lambda i: _DictLoan(member, book, date.fromordinal(730000 + i % 5000).isoformat(),
+                                                  date.fromordinal(730014 + i % 5000).isoformat()), count),
+            _bytes_per_record(lambda i: Loan(member, book, date.fromordinal(730000 + i % 5000).isoformat(),
+                                             date.fromordinal(730014 + i % 5000).isoformat(), loan_id=i), count),
+        ),
+    }
+
+
+# Benchmark Suite - สร้างข้อมูลจำลองแบบกำหนด seed ได้ และจับเวลาการทำงานหลักของ Library
+
+_TITLE_ADJECTIVES = ["Silent", "Hidden", "Last", "Golden", "Broken", "Forgotten", "Secret", "Little", "Dark",
+                     "Endless", "Lost", "Wild", "Quiet", "Burning", "Distant", "Crimson", "Frozen", "Ancient"]
+_TITLE_NOUNS = ["River", "Garden", "City", "Kingdom", "Ocean", "House", "Mountain", "Road", "Storm", "Island",
+                "Empire", "Forest", "Letter", "Night", "Bridge", "Shadow", "Harbor", "Winter", "Machine", "Voice"]
+_FIRST_NAMES = ["Anan", "Somchai", "Malee", "Niran", "Ploy", "James", "Maria", "Chen", "Aiko", "Omar", "Sofia",
+                "Liam", "Fatima", "Lucas", "Priya", "Noah", "Elena", "Kenji", "Amara", "David"]
+_LAST_NAMES = ["Srisuk", "Wongsa", "Chaiyaporn", "Smith", "Garcia", "Wang", "Tanaka", "Hassan", "Rossi", "Kim",
+               "Nguyen", "Muller", "Silva", "Patel", "Brown", "Ivanova", "Jensen", "Okafor", "Lopez", "Suzuki"]
+# ประเภทหนังสือและสัดส่วนโดยประมาณ
+_GENRES = {"Fiction": 30, "Mystery": 12, "Science Fiction": 8, "Fantasy": 8, "Romance": 10, "Biography": 6,
+           "History": 7, "Science": 6, "Children": 9, "Self-Help": 4}
+
+
+def generate_library(scale: int, seed: int = 0, years: int = 3, loans_per_member: float = 1.0,
+                     open_fraction: float = 0.05, end: date = date(2024, 1, 1)) -> Library:
+    # สร้าง Library ที่มีสมาชิก scale คน หนังสือ scale เล่ม และประวัติการยืม years ปีก่อนวันที่ end
+    # ผลลัพธ์เหมือนเดิมทุกครั้งเมื่อใช้ seed เดิม
+    rng = random.Random(seed)
+    library = Library()
+    
+    library.add_members(
+        Member(f"M{i:07d}", f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}", f"member{i}@example.com")
+        for i in range(scale)
+    )
+    
+    # ผู้แต่งมีความนิยมแบบ Zipf: ผู้แต่งไม่กี่คนเขียนหนังสือส่วนใหญ่
+    authors = [f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}" for _ in range(max(10, scale // 10))]
+    author_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(authors))))
+    genres, genre_weights = list(_GENRES), list(itertools.accumulate(_GENRES.values()))
+    seen_titles: Dict[str, int] = {}
+    
+    def make_book(i: int) -> Book:
+        if rng.random() < 0.5:
+            title = f"The {rng.choice(_TITLE_ADJECTIVES)} {rng.choice(_TITLE_NOUNS)}"
+        else:
+            title = f"{rng.choice(_TITLE_NOUNS)} of the {rng.choice(_TITLE_ADJECTIVES)} {rng.choice(_TITLE_NOUNS)}"
+        # ชื่อซ้ำจะกลายเป็นเล่มต่อ เพื่อให้ค้นหาด้วยชื่อตรงตัวได้เล่มเดียว
+        count = seen_titles[title] = seen_titles.get(title, 0) + 1
+        if count > 1:
+            title = f"{title}, Volume {count}"
+        return Book(title, rng.choices(authors, cum_weights=author_weights)[0], rng.randint(1950, end.year),
+                    f"978{i:010d}", rng.choices(genres, cum_weights=genre_weights)[0])
+    
+    library.add_publications(make_book(i) for i in range(scale))
+    
+    # ประวัติการยืมที่คืนแล้วกระจายตลอดช่วงเวลา ส่วนรายการที่ยังไม่คืนยืมภายใน 60 วันล่าสุด (บางรายการเกินกำหนด)
+    first = end.toordinal() - years * 365
+    total = int(scale * loans_per_member)
+    open_count = min(int(total * open_fraction), scale)
+    history = sorted(rng.randrange(first, end.toordinal() - 14) for _ in range(total - open_count))
+    
+    def make_loan(loan_ordinal: int, publication_position: int, returned: bool) -> Loan:
+        loan = Loan(library.members[rng.randrange(scale)], library.publications[publication_position],
+                    date.fromordinal(loan_ordinal).isoformat(), date.fromordinal(loan_ordinal + 14).isoformat())
+        loan.returned = returned
+        return loan
+    
+    library.add_loans(make_loan(ordinal, rng.randrange(scale), True) for ordinal in history)
+    library.add_loans(make_loan(end.toordinal() - rng.randrange(60), position, False)
+                      for position in rng.sample(range(scale), open_count))
+    return library
+
+
+def _time_calls(calls: List[Callable[[], Any]]) -> Dict[str, float]:
+    # จับเวลาแต่ละครั้งแยกกัน แล้วสรุปเป็นค่าเฉลี่ยและ percentile (หน่วยไมโครวินาที)
+    timings = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "mean_us": round(sum(timings) / len(timings), 2),
+        "p50_us": round(timings[len(timings) // 2], 2),
+        "p95_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        "max_us": round(timings[-1], 2),
+    }
+
+
+def benchmark_library(scale: int, seed: int = 0, calls: int = 1000) -> List[Dict[str, Any]]:
+    # คืนผลเป็น list ของ dict (หนึ่งรายการต่อ operation) สำหรับบันทึกเป็น JSON และเทียบระหว่างเวอร์ชัน
+    started = time.perf_counter()
+    library = generate_library(scale, seed)
+    setup_s = time.perf_counter() - started
+    rng = random.Random(seed + 1)
+    # สมาชิกและหนังสือที่ใช้ทดสอบ (สุ่มไว้ก่อนเพื่อไม่ให้เวลาสุ่มรวมอยู่ในผล)
+    member_ids = [rng.choice(library.members).member_id for _ in range(calls)]
+    available = [p.title for p in rng.sample(library.publications, min(calls, scale))
+                 if library.get_active_loan(p.title) is None]
+    # operation ที่ช้ากว่าวัดเพียง 1/10 ของ calls (อย่างน้อย 1 ครั้ง)
+    slow_calls = max(1, calls // 10)
+    search_terms = {
+        "title": [rng.choice(_TITLE_NOUNS + _TITLE_ADJECTIVES).lower() for _ in range(slow_calls)],
+        "author": [rng.choice(_LAST_NAMES).lower() for _ in range(slow_calls)],
+        "genre": [rng.choice(list(_GENRES)).lower() for _ in range(slow_calls)],
+    }
+    
+    operations: List[Tuple[str, List[Callable[[], Any]]]] = [
+        ("find_member", [lambda m=m: library.find_member(m) for m in member_ids]),
+    ]
+    for search_type, terms in search_terms.items():
+        # ล้าง cache ก่อนแต่ละครั้งเพื่อวัดการค้นจาก index จริง
+        operations.append((f"find_publications[{search_type}]", [
+            lambda t=t, st=search_type: (library._search_cache.clear(), library.find_publications(t, st, limit=100))
+            for t in terms
+        ]))
+    operations += [
+        ("borrow_publication", [lambda m=m, t=t: library.borrow_publication(m, t, "2024-01-01", "2024-01-15")
+                                for m, t in zip(member_ids, available)]),
+        ("return_publication", [lambda t=t: library.return_publication(t) for t in available]),
+        ("generate_overdue_report", [library.generate_overdue_report for _ in range(3)]),
+        ("get_member_history", [lambda m=m: library.get_member_history(m) for m in member_ids[:slow_calls]]),
+    ]
+    
+    results = []
+    for name, op_calls in operations:
+        if not op_calls:
+            # เช่น ไม่มีหนังสือว่างในตัวอย่างที่สุ่มได้ จึงไม่มีอะไรให้จับเวลา
+            continue
+        row = {"operation": name, "scale": scale, "seed": seed}
+        row.update(_time_calls(op_calls))
+        results.append(row)
+    results.append({"operation": "generate_library", "scale": scale, "seed": seed, "calls": 1,
+                    "mean_us": round(setup_s * 1e6, 2)})
+    return results
+
+
+def run_benchmarks(scales: Iterable[int] = (1000, 100_000, 1_000_000), seed: int = 0,
+                   output: Optional[str] = None) -> List[Dict[str, Any]]:
+    # รันทุกขนาดข้อมูลแล้วเขียนผลเป็น JSON Lines (หนึ่งบรรทัดต่อ operation) ลงไฟล์ output หรือ stdout
+    environment = {"python": platform.python_version(), "platform": platform.platform(),
+                   "run_at": datetime.now().isoformat(timespec="seconds")}
+    results = []
+    with (open(output, "w", encoding="utf-8") if output else contextlib.nullcontext(sys.stdout)) as f:
+        for scale in scales:
+            for row in benchmark_library(scale, seed):
+                row.update(environment)
+                results.append(row)
+                f.write(json.dumps(row) + "\n")
+                f.flush()
+    return results
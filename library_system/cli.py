@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import date
+from typing import List, Optional
+
+from .instrumentation import instrumentation
+from .library import Library
+from .records import RECORD_FIELDS, export_records, import_records
+from .storage import JournalStorage, SQLiteStorage
+
+
+# CLI - ใช้งาน Library จาก script หรือ cron โดยไม่ import GUI (tkinter) หรือ unittest
+# module ที่หนัก (GUI, analytics, benchmark, tests) ถูก import เฉพาะใน command ที่ใช้
+
+# เวลาเริ่มต้นสูงสุดที่ยอมรับได้ของ `import library_system.cli` ใน process ใหม่ (วินาที รวมเวลาเริ่ม Python)
+STARTUP_BUDGET_S = 0.25
+# module ที่ต้องไม่ถูก import ตอนเริ่มต้นแบบ headless
+HEAVY_MODULES = ("tkinter", "unittest", "numpy", "multiprocessing", "tracemalloc")
+
+
+def open_library(args: argparse.Namespace, thread_safe: bool = False) -> Library:
+    if args.journal:
+        return Library(JournalStorage(args.journal), thread_safe=thread_safe)
+    return Library(SQLiteStorage(args.db), thread_safe=thread_safe)
+
+
+def _as_of(value: Optional[str]) -> date:
+    return date.fromisoformat(value) if value else date.today()
+
+
+def run_gui(args: argparse.Namespace) -> int:
+    import tkinter as tk
+    from .gui import LibraryApp
+
+    if args.instrument:
+        # เริ่มวัดเวลาตั้งแต่เปิดโปรแกรม (เปิด/ปิดภายหลังได้ในแท็บ Diagnostics)
+        instrumentation.enable()
+    # GUI รันงานใน background thread จึงต้องใช้โหมด thread-safe
+    root = tk.Tk()
+    LibraryApp(root, open_library(args, thread_safe=True))
+    root.mainloop()
+    return 0
+
+
+def _error(message: str) -> int:
+    # แสดงข้อผิดพลาดที่ผู้ใช้แก้ได้เอง (เช่น ไฟล์ไม่มีอยู่) แทน traceback
+    print(f"Error: {message}", file=sys.stderr)
+    return 2
+
+
+def run_import(args: argparse.Namespace) -> int:
+    library = open_library(args)
+    try:
+        report = import_records(library, args.path, args.kind)
+    except (OSError, ValueError) as e:
+        return _error(str(e))
+    finally:
+        library.close()
+    print(report.summary())
+    return 1 if report.errors else 0
+
+
+def run_export(args: argparse.Namespace) -> int:
+    library = open_library(args)
+    try:
+        count = export_records(library, args.path, args.kind)
+    except (OSError, ValueError) as e:
+        return _error(str(e))
+    finally:
+        library.close()
+    print(f"Exported {count} records.")
+    return 0
+
+
+def run_overdue(args: argparse.Namespace) -> int:
+    library = open_library(args)
+    try:
+        loans = library.get_overdue_loans(_as_of(args.as_of))
+        print("\n".join(loan.display_loan() for loan in loans) if loans else "No overdue loans.")
+    finally:
+        library.close()
+    return 0
+
+
+def run_stats(args: argparse.Namespace) -> int:
+    from .analytics import analyze_loans
+
+    library = open_library(args)
+    try:
+        statistics = analyze_loans(library, _as_of(args.as_of), args.workers)
+    finally:
+        library.close()
+    for section, name, value in statistics.rows():
+        if args.json:
+            print(json.dumps({"section": section, "name": name, "value": value}, ensure_ascii=False))
+        else:
+            print(f"{section}\t{name}\t{value}")
+    return 0
+
+
+def run_benchmark(args: argparse.Namespace) -> int:
+    from .benchmark import run_benchmarks
+
+    run_benchmarks([int(n) for n in args.scales.split(",")], seed=args.seed, output=args.output)
+    return 0
+
+
+def run_benchmark_memory(args: argparse.Namespace) -> int:
+    from .benchmark import benchmark_memory
+
+    for name, (before, after) in benchmark_memory().items():
+        print(f"{name}: {before:.0f} -> {after:.0f} bytes/record")
+    return 0
+
+
+def run_tests(args: argparse.Namespace) -> int:
+    # รัน tests เฉพาะเมื่อสั่ง (ไม่รันทุกครั้งที่เปิดโปรแกรมเหมือนเดิม)
+    import unittest
+
+    tests_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests")
+    suite = unittest.defaultTestLoader.discover(tests_dir)
+    result = unittest.TextTestRunner(verbosity=args.verbosity).run(suite)
+    return 0 if result.wasSuccessful() else 1
+
+
+def measure_startup(repeat: int = 5) -> dict:
+    # เวลาที่ดีที่สุดจาก repeat ครั้งของการ import CLI ใน process ใหม่ และ module หนักที่ถูก import ไปด้วย
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (f"import sys; import library_system.cli; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    timings = []
+    loaded = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], cwd=package_root, check=True,
+                                capture_output=True, text=True).stdout
+        timings.append(time.perf_counter() - start)
+        loaded = output.strip()
+    return {"seconds": min(timings), "budget_seconds": STARTUP_BUDGET_S,
+            "heavy_modules": loaded.split(",") if loaded else []}
+
+
+def run_startup_time(args: argparse.Namespace) -> int:
+    result = measure_startup()
+    print(json.dumps(result))
+    return 0 if result["seconds"] <= args.budget and not result["heavy_modules"] else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    storage_options = argparse.ArgumentParser(add_help=False)
+    storage_options.add_argument("--db", default="library.db", help="SQLite database file (default: library.db)")
+    storage_options.add_argument("--journal", metavar="DIR", help="use an event journal directory instead of SQLite")
+
+    parser = argparse.ArgumentParser(prog="library_system", description="Library Management System")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    gui = commands.add_parser("gui", parents=[storage_options], help="open the desktop application")
+    gui.add_argument("--instrument", action="store_true", help="record method timings from startup")
+    gui.set_defaults(func=run_gui)
+
+    for name, func, help_text in (("import", run_import, "import records from a .csv or .jsonl file"),
+                                  ("export", run_export, "export records to a .csv or .jsonl file")):
+        command = commands.add_parser(name, parents=[storage_options], help=help_text)
+        command.add_argument("kind", choices=list(RECORD_FIELDS))
+        command.add_argument("path")
+        command.set_defaults(func=func)
+
+    overdue = commands.add_parser("overdue", parents=[storage_options], help="print the overdue report")
+    overdue.add_argument("--as-of", help="date to check against (YYYY-MM-DD, default: today)")
+    overdue.set_defaults(func=run_overdue)
+
+    stats = commands.add_parser("stats", parents=[storage_options], help="print circulation statistics")
+    stats.add_argument("--as-of", help="date to check against (YYYY-MM-DD, default: today)")
+    stats.add_argument("--workers", type=int, help="number of worker processes (default: CPU count)")
+    stats.add_argument("--json", action="store_true", help="print one JSON object per line")
+    stats.set_defaults(func=run_stats)
+
+    benchmark = commands.add_parser("benchmark", help="time the main Library operations on synthetic data")
+    benchmark.add_argument("--scales", default="1000,100000,1000000", help="comma-separated library sizes")
+    benchmark.add_argument("--seed", type=int, default=0)
+    benchmark.add_argument("--output", help="JSON Lines output file (default: stdout)")
+    benchmark.set_defaults(func=run_benchmark)
+
+    commands.add_parser("benchmark-memory", help="compare bytes per record with and without __slots__"
+                        ).set_defaults(func=run_benchmark_memory)
+
+    test = commands.add_parser("test", help="run the unit tests")
+    test.add_argument("-v", "--verbosity", type=int, default=2)
+    test.set_defaults(func=run_tests)
+
+    startup = commands.add_parser("startup-time", help="check headless startup time against the budget")
+    startup.add_argument("--budget", type=float, default=STARTUP_BUDGET_S, help="seconds")
+    startup.set_defaults(func=run_startup_time)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    return args.func(args)
@@ -0,0 +1,653 @@
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .analytics import LoanStatistics, analyze_loans
+from .instrumentation import instrumentation
+from .library import Library
+from .models import Book, CirculationResult, LibraryError, LibraryEvent, Loan, Member, Publication
+from .records import export_records, import_records
+from .tasks import BackgroundTask, BackgroundTasks
+
+
+# GUI Application - ส่วนติดต่อผู้ใช้
+
+class PagedTreeview(ttk.Frame):
+    # Treeview ที่โหลดข้อมูลทีละหน้าเมื่อผู้ใช้เลื่อนลงมาใกล้ท้ายรายการ
+    # แทนการ insert ทุกแถวในครั้งเดียว: แถวจะถูกดึงและจัดรูปแบบผ่าน fetch_rows เมื่อต้องแสดงเท่านั้น
+    PAGE_SIZE = 100
+
+    def __init__(self, parent, columns: List[Tuple[str, str, int]]):
+        super().__init__(parent)
+        # columns: (ชื่อคอลัมน์, หัวคอลัมน์, ความกว้าง)
+        self.tree = ttk.Treeview(self, show='headings', columns=[name for name, _, _ in columns])
+        for name, heading, width in columns:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width)
+        
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.status_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.status_var).pack(side=tk.BOTTOM, anchor=tk.W)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self._total = 0
+        self._loaded = 0
+        self._fetch_rows: Callable[[int, int], List[tuple]] = lambda start, count: []
+        self._loading = False
+
+    def show(self, total: int, fetch_rows: Callable[[int, int], List[tuple]]) -> None:
+        # fetch_rows(start, count) ต้องคืนแถวลำดับที่ start ถึง start + count - 1
+        self.tree.delete(*self.tree.get_children())
+        self._total, self._loaded, self._fetch_rows = total, 0, fetch_rows
+        self._load_page()
+
+    def show_sequence(self, items, format_row: Callable[[Any], tuple]) -> None:
+        self.show_sections([(items, format_row)])
+
+    def show_sections(self, sections: List[Tuple[Any, Callable[[Any], tuple]]]) -> None:
+        # แสดงหลาย sequence ต่อกัน (เช่น ประวัติสมาชิก) โดยจัดรูปแบบเฉพาะแถวที่ถูกโหลด
+        def fetch_rows(start: int, count: int) -> List[tuple]:
+            rows = []
+            for items, format_row in sections:
+                if start >= len(items):
+                    start -= len(items)
+                    continue
+                rows.extend(format_row(item) for item in items[start:start + count - len(rows)])
+                start = 0
+                if len(rows) >= count:
+                    break
+            return rows
+        self.show(sum(len(items) for items, _ in sections), fetch_rows)
+
+    def clear(self) -> None:
+        self.show(0, lambda start, count: [])
+
+    def _load_page(self) -> None:
+        self._loading = False
+        count = min(self.PAGE_SIZE, self._total - self._loaded)
+        if count > 0:
+            rows = self._fetch_rows(self._loaded, count)
+            for row in rows:
+                self.tree.insert("", tk.END, values=row)
+            self._loaded += len(rows)
+            if len(rows) < count:
+                # ข้อมูลลดลงระหว่างแสดงผล
+                self._total = self._loaded
+        self.status_var.set(f"Showing {self._loaded} of {self._total} rows")
+
+    def _on_scroll(self, first, last) -> None:
+        self.scrollbar.set(first, last)
+        # โหลดหน้าถัดไปเมื่อเลื่อนมาใกล้ท้ายรายการ (หรือเมื่อหน้าแรกยังไม่เต็มพื้นที่)
+        if float(last) > 0.9 and self._loaded < self._total and not self._loading:
+            self._loading = True
+            self.after_idle(self._load_page)
+
+
+LOAN_COLUMNS = [
+    ("title", "Title", 200),
+    ("member", "Member", 120),
+    ("loan_date", "Loan Date", 90),
+    ("due_date", "Due Date", 90),
+    ("status", "Status", 70),
+    ("barcode", "Barcode", 110),
+]
+
+PUBLICATION_COLUMNS = [
+    ("title", "Title", 200),
+    ("author", "Author", 140),
+    ("year", "Year", 50),
+    ("genre", "Genre", 100),
+    ("isbn", "ISBN", 110),
+    ("copies", "Copies", 60),
+]
+
+
+def loan_row(loan: Loan) -> tuple:
+    return (loan.publication.title, loan.member.name, loan.loan_date, loan.due_date,
+            "Returned" if loan.returned else "Active", loan.barcode)
+
+
+def publication_row(publication: Publication) -> tuple:
+    return (publication.title, publication.author, publication.year,
+            getattr(publication, "genre", ""), getattr(publication, "ISBN", ""), publication.copies)
+
+
+DIAGNOSTIC_COLUMNS = [
+    ("method", "Method", 220),
+    ("calls", "Calls", 60),
+    ("errors", "Errors", 60),
+    ("p50_us", "p50 (µs)", 80),
+    ("p95_us", "p95 (µs)", 80),
+    ("p99_us", "p99 (µs)", 80),
+    ("max_us", "Max (µs)", 80),
+    ("mean_result_size", "Avg Size", 70),
+]
+
+
+STATISTICS_COLUMNS = [
+    ("section", "Section", 100),
+    ("name", "Item", 260),
+    ("value", "Value", 100),
+]
+
+
+class LibraryApp:
+    AUTOSAVE_INTERVAL_MS = 5000
+    SEARCH_DEBOUNCE_MS = 200
+    # คำค้นที่สั้นกว่านี้มักตรงกับเกือบทั้ง catalog จึงไม่ค้นอัตโนมัติ (กดปุ่ม Search ได้)
+    LIVE_SEARCH_MIN_CHARS = 3
+    # แท็บทั้งหมด: (ชื่อแท็บ, method ที่สร้างเนื้อหาของแท็บ)
+    TABS = [
+        ("Member Management", "create_member_tab"),
+        ("Publication Management", "create_publication_tab"),
+        ("Loan Management", "create_loan_tab"),
+        ("Reports", "create_report_tab"),
+        ("Diagnostics", "create_diagnostics_tab"),
+    ]
+
+    def __init__(self, root, library: Optional[Library] = None):
+        # สร้าง instance ของระบบห้องสมุด (thread-safe เพราะงานค้นหา/รายงานรันใน background thread)
+        self.library = library or Library(thread_safe=True)
+        self.root = root
+        self.root.title("Library Management System")
+        self.root.geometry("800x600")
+        # บันทึกข้อมูลที่ค้างอยู่เป็นระยะ และบันทึกครั้งสุดท้ายตอนปิดหน้าต่าง
+        self.root.after(self.AUTOSAVE_INTERVAL_MS, self.autosave)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # แสดงข้อความเมื่อ Library แจ้งว่าทำงานสำเร็จ
+        self.library.subscribe(self.on_library_event)
+        
+        # สร้าง notebook สำหรับแท็บต่างๆ
+        self.notebook = ttk.Notebook(root)
+        self.notebook.pack(expand=True, fill='both', padx=10, pady=5)
+        
+        # สร้างเฉพาะกรอบของแต่ละแท็บ เนื้อหาจะถูกสร้างเมื่อเลือกแท็บนั้นครั้งแรก (เปิดโปรแกรมได้เร็วขึ้น)
+        self._tab_builders: Dict[str, Tuple[str, ttk.Frame]] = {}
+        self._built_tabs: Set[str] = set()
+        for text, builder in self.TABS:
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=text)
+            self._tab_builders[str(frame)] = (builder, frame)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        # ใช้ร่วมกันระหว่างแท็บ Reports และการแจ้งเตือนจาก Library
+        self.report_stats_var = tk.StringVar()
+        
+        # แถบสถานะสำหรับงานที่รันอยู่เบื้องหลัง
+        status_frame = ttk.Frame(root)
+        status_frame.pack(fill=tk.X, padx=10, pady=(0, 5))
+        self.task_status_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.task_status_var).pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(status_frame, text="Cancel", command=self.cancel_tasks, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT)
+        self.task_progress = ttk.Progressbar(status_frame, mode="indeterminate", length=150)
+        self.task_progress.pack(side=tk.RIGHT, padx=5)
+        self.tasks = BackgroundTasks(self.root.after, on_change=self.on_tasks_changed)
+        self.on_tab_changed()
+    
+    def on_tab_changed(self, event=None):
+        builder, frame = self._tab_builders.pop(self.notebook.select(), (None, None))
+        if builder is not None:
+            self._built_tabs.add(builder)
+            getattr(self, builder)(frame)
+    
+    def create_member_tab(self, member_frame: ttk.Frame):
+        # แบ่งเป็น 2 ส่วน: ซ้ายสำหรับจัดการข้อมูล, ขวาสำหรับแสดงประวัติ
+        left_frame = ttk.Frame(member_frame)
+        left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10)
+        
+        right_frame = ttk.Frame(member_frame)
+        right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10)
+        
+        # ส่วนซ้าย - จัดการข้อมูลสมาชิก
+        ttk.Label(left_frame, text="Member Management", font=("Arial", 14)).pack(pady=10)
+        
+        # Member ID
+        ttk.Label(left_frame, text="Member ID:").pack()
+        self.member_id_var = tk.StringVar()
+        ttk.Entry(left_frame, textvariable=self.member_id_var).pack()
+        
+        # Name
+        ttk.Label(left_frame, text="Name:").pack()
+        self.member_name_var = tk.StringVar()
+        ttk.Entry(left_frame, textvariable=self.member_name_var).pack()
+        
+        # Contact
+        ttk.Label(left_frame, text="Contact:").pack()
+        self.member_contact_var = tk.StringVar()
+        ttk.Entry(left_frame, textvariable=self.member_contact_var).pack()
+        
+        # Buttons
+        ttk.Button(left_frame, text="Add Member", command=self.add_member).pack(pady=5)
+        ttk.Button(left_frame, text="Update Member", command=self.update_member).pack(pady=5)
+        ttk.Button(left_frame, text="Remove Member", command=self.remove_member).pack(pady=5)
+        ttk.Button(left_frame, text="Show Member History", command=self.show_member_history).pack(pady=5)
+        ttk.Button(left_frame, text="Import Members...", command=lambda: self.import_file("members")).pack(pady=5)
+        ttk.Button(left_frame, text="Export Members...", command=lambda: self.export_file("members")).pack(pady=5)
+        
+        # ส่วนขวา - แสดงประวัติ
+        ttk.Label(right_frame, text="Member History", font=("Arial", 14)).pack(pady=10)
+        
+        # สร้าง Treeview สำหรับแสดงประวัติ (โหลดทีละหน้าเมื่อเลื่อน)
+        self.history_view = PagedTreeview(right_frame, [
+            ("date", "Date", 100),
+            ("action", "Action", 100),
+            ("details", "Details", 200),
+        ])
+        self.history_view.pack(fill=tk.BOTH, expand=True)
+    
+    def create_publication_tab(self, pub_frame: ttk.Frame):
+        # Publication management controls
+        ttk.Label(pub_frame, text="Publication Management", font=("Arial", 14)).pack(pady=10)
+        
+        # Add publication section
+        ttk.Label(pub_frame, text="Title:").pack()
+        self.title_var = tk.StringVar()
+        ttk.Entry(pub_frame, textvariable=self.title_var).pack()
+        
+        ttk.Label(pub_frame, text="Author:").pack()
+        self.author_var = tk.StringVar()
+        ttk.Entry(pub_frame, textvariable=self.author_var).pack()
+        
+        ttk.Label(pub_frame, text="Year:").pack()
+        self.year_var = tk.StringVar()
+        ttk.Entry(pub_frame, textvariable=self.year_var).pack()
+        
+        ttk.Label(pub_frame, text="ISBN:").pack()
+        self.isbn_var = tk.StringVar()
+        ttk.Entry(pub_frame, textvariable=self.isbn_var).pack()
+        
+        ttk.Label(pub_frame, text="Genre:").pack()
+        self.genre_var = tk.StringVar()
+        ttk.Entry(pub_frame, textvariable=self.genre_var).pack()
+        
+        ttk.Label(pub_frame, text="Copies:").pack()
+        self.copies_var = tk.StringVar(value="1")
+        ttk.Entry(pub_frame, textvariable=self.copies_var).pack()
+        
+        ttk.Button(pub_frame, text="Add Book", command=self.add_book).pack(pady=5)
+        
+        # Search section
+        ttk.Label(pub_frame, text="Search Publications").pack(pady=10)
+        self.search_var = tk.StringVar()
+        ttk.Entry(pub_frame, textvariable=self.search_var).pack()
+        # ค้นหาอัตโนมัติขณะพิมพ์ (รอให้หยุดพิมพ์ก่อนตาม SEARCH_DEBOUNCE_MS)
+        self._search_after_id = None
+        self.search_var.trace_add("write", self.schedule_live_search)
+        
+        self.search_type_var = tk.StringVar(value="title")
+        ttk.Radiobutton(pub_frame, text="By Title", variable=self.search_type_var, value="title").pack()
+        ttk.Radiobutton(pub_frame, text="By Author", variable=self.search_type_var, value="author").pack()
+        ttk.Radiobutton(pub_frame, text="By Genre", variable=self.search_type_var, value="genre").pack()
+        self.search_type_var.trace_add("write", self.schedule_live_search)
+        ttk.Button(pub_frame, text="Search", command=self.search_publications).pack(pady=5)
+        ttk.Button(pub_frame, text="Import Books...", command=lambda: self.import_file("publications")).pack(pady=5)
+        ttk.Button(pub_frame, text="Export Books...", command=lambda: self.export_file("publications")).pack(pady=5)
+        
+        # ผลการค้นหา
+        self.search_results_view = PagedTreeview(pub_frame, PUBLICATION_COLUMNS)
+        self.search_results_view.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    
+    def create_loan_tab(self, loan_frame: ttk.Frame):
+        # Loan management controls
+        ttk.Label(loan_frame, text="Loan Management", font=("Arial", 14)).pack(pady=10)
+        
+        ttk.Label(loan_frame, text="Member ID:").pack()
+        self.loan_member_id_var = tk.StringVar()
+        ttk.Entry(loan_frame, textvariable=self.loan_member_id_var).pack()
+        
+        ttk.Label(loan_frame, text="Publication Title:").pack()
+        self.loan_title_var = tk.StringVar()
+        ttk.Entry(loan_frame, textvariable=self.loan_title_var).pack()
+        
+        ttk.Button(loan_frame, text="Borrow", command=self.borrow_publication).pack(pady=5)
+        ttk.Button(loan_frame, text="Return", command=self.return_publication).pack(pady=5)
+        ttk.Button(loan_frame, text="Reserve", command=self.reserve_publication).pack(pady=5)
+        ttk.Button(loan_frame, text="Cancel Reservation", command=self.cancel_reservation).pack(pady=5)
+        ttk.Button(loan_frame, text="Check Availability", command=self.show_availability).pack(pady=5)
+        
+        # ยืม/คืนหลายรายการพร้อมกัน (หนึ่งชื่อหรือ ISBN ต่อบรรทัด)
+        ttk.Label(loan_frame, text="Titles or ISBNs (one per line):").pack()
+        self.batch_items_text = tk.Text(loan_frame, height=6, width=40)
+        self.batch_items_text.pack()
+        ttk.Button(loan_frame, text="Borrow All", command=self.borrow_batch).pack(pady=5)
+        ttk.Button(loan_frame, text="Return All", command=self.return_batch).pack(pady=5)
+        ttk.Button(loan_frame, text="Import Loans...", command=lambda: self.import_file("loans")).pack(pady=5)
+        ttk.Button(loan_frame, text="Export Loans...", command=lambda: self.export_file("loans")).pack(pady=5)
+    
+    def create_report_tab(self, report_frame: ttk.Frame):
+        # Report controls
+        ttk.Label(report_frame, text="Reports", font=("Arial", 14)).pack(pady=10)
+        ttk.Button(report_frame, text="Show Active Loans", command=self.show_loan_report).pack(pady=5)
+        ttk.Button(report_frame, text="Show Overdue Items", command=self.show_overdue_report).pack(pady=5)
+        ttk.Button(report_frame, text="Circulation Statistics", command=self.show_circulation_statistics).pack(pady=5)
+        
+        # สรุปจากตัวนับของ Library (อัพเดทเมื่อมีการยืม/คืน)
+        ttk.Label(report_frame, textvariable=self.report_stats_var).pack()
+        self.refresh_statistics()
+        
+        self.report_title_var = tk.StringVar()
+        ttk.Label(report_frame, textvariable=self.report_title_var).pack()
+        self.report_view = PagedTreeview(report_frame, LOAN_COLUMNS)
+        self.report_view.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        # ตารางสำหรับสถิติการยืม (แสดงแทน report_view เมื่อดูสถิติ)
+        self.statistics_view = PagedTreeview(report_frame, STATISTICS_COLUMNS)
+    
+    def on_library_event(self, event: LibraryEvent):
+        # event อาจมาจาก background thread จึงต้องส่งไปแสดงใน main thread
+        self.tasks.call_in_main(lambda: messagebox.showinfo("Success", event.message))
+        if "create_report_tab" in self._built_tabs and event.kind in (
+                "publication_borrowed", "publication_returned", "publications_borrowed", "publications_returned"):
+            self.tasks.call_in_main(self.refresh_statistics)
+
+    def refresh_statistics(self):
+        # ครั้งแรกอาจต้องนับจำนวนครั้งที่ยืมจาก storage จึงรันใน background
+        self.tasks.submit(lambda task: self.library.get_loan_statistics(), self._show_statistics,
+                          self.show_error, channel="statistics")
+
+    def _show_statistics(self, stats: Dict[str, Any]):
+        top = ", ".join(f"{title} ({count})" for title, count in stats["most_borrowed"][:3]) or "-"
+        self.report_stats_var.set(f"Active: {stats['active']}   Overdue: {stats['overdue']}   "
+                                  f"Members borrowing: {stats['members_with_loans']}   Most borrowed: {top}")
+
+    def on_tasks_changed(self, running: List[BackgroundTask]):
+        if running:
+            self.task_status_var.set(f"Working... ({len(running)} task{'s' if len(running) > 1 else ''})")
+            self.task_progress.start(10)
+            self.cancel_button.configure(state=tk.NORMAL)
+        else:
+            self.task_status_var.set("")
+            self.task_progress.stop()
+            self.cancel_button.configure(state=tk.DISABLED)
+
+    def cancel_tasks(self):
+        # ผลลัพธ์ของงานที่ถูกยกเลิกจะไม่ถูกแสดง (การยืมที่เริ่มทำไปแล้วจะยังคงสำเร็จ)
+        self.tasks.cancel_all()
+
+    def show_error(self, error: Exception):
+        if isinstance(error, LibraryError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Unexpected error: {error}")
+
+    def run_action(self, action, *args):
+        # เรียกใช้ Library และแสดงข้อผิดพลาดใน dialog แทนการให้ exception หลุดออกไป
+        try:
+            return action(*args)
+        except LibraryError as e:
+            messagebox.showerror("Error", str(e))
+            return None
+
+    def autosave(self):
+        self.library.flush()
+        self.root.after(self.AUTOSAVE_INTERVAL_MS, self.autosave)
+
+    def on_close(self):
+        self.tasks.shutdown()
+        self.library.close()
+        self.root.destroy()
+
+    # Implementation of callback methods
+    def add_member(self):
+        member = Member(self.member_id_var.get(), self.member_name_var.get(), self.member_contact_var.get())
+        self.run_action(self.library.add_member, member)
+    
+    def update_member(self):
+        member = self.run_action(
+            self.library.update_member,
+            self.member_id_var.get(),
+            self.member_name_var.get(),
+            self.member_contact_var.get()
+        )
+        # อัพเดทการแสดงผลประวัติ
+        if member:
+            self.show_member_history()
+    
+    def remove_member(self):
+        self.run_action(self.library.remove_member, self.member_id_var.get())
+    
+    def add_book(self):
+        try:
+            # แปลงปีเป็นตัวเลข ถ้าแปลงไม่ได้จะเกิด ValueError
+            book = Book(
+                self.title_var.get(),  # ดึงค่าจาก StringVar
+                self.author_var.get(),
+                int(self.year_var.get()),  # แปลงเป็นตัวเลข
+                self.isbn_var.get(),
+                self.genre_var.get(),
+                int(self.copies_var.get())
+            )
+            self.run_action(self.library.add_publication, book)
+        except ValueError:
+            # ถ้าแปลงปีหรือจำนวนเล่มเป็นตัวเลขไม่ได้ หรือจำนวนเล่มน้อยกว่า 1 (add_publication ปฏิเสธ) จะแสดง error
+            messagebox.showerror("Error", "Invalid year or copies format!")
+    
+    def import_file(self, kind):
+        # นำเข้าข้อมูลจากไฟล์ แล้วแสดงสรุปผลพร้อมแถวที่ผิดพลาดใน dialog เดียว
+        path = filedialog.askopenfilename(filetypes=[("CSV / JSON Lines", "*.csv *.jsonl")])
+        if not path:
+            return
+        try:
+            report = import_records(self.library, path, kind)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        messagebox.showinfo("Import", report.summary())
+
+    def export_file(self, kind):
+        path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+        if not path:
+            return
+        try:
+            count = export_records(self.library, path, kind)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        messagebox.showinfo("Export", f"Exported {count} records.")
+
+    def schedule_live_search(self, *args):
+        # เลื่อนการค้นหาออกไปทุกครั้งที่มีการพิมพ์ เพื่อค้นหาเพียงครั้งเดียวเมื่อหยุดพิมพ์
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(self.SEARCH_DEBOUNCE_MS, self.live_search)
+
+    def live_search(self):
+        self._search_after_id = None
+        if len(self.search_var.get().strip()) >= self.LIVE_SEARCH_MIN_CHARS:
+            self.search_publications()
+        else:
+            self.search_results_view.clear()
+
+    def search_publications(self):
+        # ค้นหาใน background; การค้นหาครั้งใหม่จะแทนที่ครั้งก่อนที่ยังไม่เสร็จ
+        term, search_type = self.search_var.get(), self.search_type_var.get()
+        # งานใน background นับผลลัพธ์ (และเก็บผลไว้ใน cache) จากนั้นแต่ละหน้าจะดึงจาก cache
+        self.tasks.submit(
+            lambda task: self.library.count_publications(term, search_type),
+            lambda total: self.search_results_view.show(
+                total,
+                lambda start, count: [publication_row(p) for p in
+                                      self.library.find_publications(term, search_type, start, count)]
+            ),
+            self.show_error,
+            channel="search"
+        )
+    
+    def borrow_publication(self):
+        # ทำการยืมหนังสือโดยกำหนดวันคืนเป็น 14 วันนับจากวันที่ยืม
+        member_id, title = self.loan_member_id_var.get(), self.loan_title_var.get()
+        loan_date = datetime.now().strftime("%Y-%m-%d")  # วันที่ยืม (วันนี้)
+        due_date = (datetime.now() + timedelta(days=14)).strftime("%Y-%m-%d")  # วันกำหนดคืน (อีก 14 วัน)
+        self.tasks.submit(
+            lambda task: self.library.borrow_publication(member_id, title, loan_date, due_date),
+            lambda loan: None,  # ข้อความสำเร็จแสดงผ่าน on_library_event
+            self.show_error
+        )
+    
+    def return_publication(self):
+        self.run_action(self.library.return_publication, self.loan_title_var.get())
+    
+    def reserve_publication(self):
+        self.run_action(self.library.reserve_publication, self.loan_member_id_var.get(), self.loan_title_var.get())
+    
+    def cancel_reservation(self):
+        self.run_action(self.library.cancel_reservation, self.loan_member_id_var.get(), self.loan_title_var.get())
+    
+    def show_availability(self):
+        title = self.loan_title_var.get()
+        publication = self.library.find_publication_by_title(title)
+        if not publication:
+            messagebox.showerror("Error", "Publication not found!")
+            return
+        next_member = self.library.next_in_line(title)
+        messagebox.showinfo("Availability", (
+            f"{self.library.count_available(title)} of {publication.copies} copies available.\n"
+            f"Reservations: {self.library.count_reservations(title)}"
+            + (f" (next: {next_member.name})" if next_member else "")
+        ))
+    
+    def _batch_items(self) -> List[str]:
+        return [line.strip() for line in self.batch_items_text.get("1.0", tk.END).splitlines() if line.strip()]
+    
+    def borrow_batch(self):
+        # ยืมทั้งหมดหรือไม่ยืมเลย เพื่อให้แก้รายการแล้วกดใหม่ได้
+        member_id, items = self.loan_member_id_var.get(), self._batch_items()
+        loan_date = datetime.now().strftime("%Y-%m-%d")
+        due_date = (datetime.now() + timedelta(days=14)).strftime("%Y-%m-%d")
+        self.tasks.submit(
+            lambda task: self.library.borrow_publications(member_id, items, loan_date, due_date),
+            self._show_batch_result,
+            self.show_error
+        )
+    
+    def return_batch(self):
+        items = self._batch_items()
+        self.tasks.submit(lambda task: self.library.return_publications(items), self._show_batch_result, self.show_error)
+    
+    def _show_batch_result(self, result: CirculationResult):
+        # ข้อความสำเร็จแสดงผ่าน on_library_event จึงแสดงเฉพาะรายการที่ผิดพลาด
+        if not result.ok:
+            messagebox.showwarning("Batch", result.summary())
+    
+    def show_loan_report(self):
+        # ดึงรายการยืมจาก Library ทีละหน้าตามที่ผู้ใช้เลื่อนดู
+        self.tasks.submit(
+            lambda task: self.library.count_active_loans(),
+            lambda total: self._show_report(
+                "Active Loans", total,
+                lambda start, count: [loan_row(loan) for loan in self.library.get_active_loans(start, count)]
+            ),
+            self.show_error,
+            channel="report"
+        )
+    
+    def show_overdue_report(self):
+        # ใช้วันที่เดียวกันตลอดการเลื่อนดูรายงาน
+        as_of = date.today()
+        self.tasks.submit(
+            lambda task: self.library.count_overdue_loans(as_of),
+            lambda total: self._show_report(
+                f"Overdue Items as of {as_of.isoformat()}", total,
+                lambda start, count: [loan_row(loan) for loan in self.library.get_overdue_loans(as_of, start, count)]
+            ),
+            self.show_error,
+            channel="report"
+        )
+
+    def _show_report(self, title: str, total: int, fetch_rows: Callable[[int, int], List[tuple]]):
+        self.report_title_var.set(title)
+        self.statistics_view.pack_forget()
+        self.report_view.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.report_view.show(total, fetch_rows)
+
+    def show_circulation_statistics(self):
+        # export และคำนวณใน background (การคำนวณกระจายไปหลาย process เมื่อข้อมูลมีขนาดใหญ่)
+        self.tasks.submit(lambda task: analyze_loans(self.library), self._show_statistics_report,
+                          self.show_error, channel="report")
+
+    def _show_statistics_report(self, statistics: LoanStatistics):
+        self.report_title_var.set(f"Circulation Statistics as of {statistics.as_of.isoformat()}")
+        self.report_view.pack_forget()
+        self.statistics_view.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.statistics_view.show_sequence(statistics.rows(), lambda row: row)
+
+    def show_member_history(self):
+        # ล้างข้อมูลเก่าใน Treeview
+        self.history_view.clear()
+        
+        member_id = self.member_id_var.get()
+        if not member_id:
+            messagebox.showerror("Error", "Please enter Member ID")
+            return
+        
+        # ดึงประวัติของสมาชิก
+        history = self.library.get_member_history(member_id)
+        if not history:
+            messagebox.showerror("Error", "Member not found")
+            return
+        
+        member = history["member"]
+        
+        # แสดงข้อมูลพื้นฐาน, ประวัติการเปลี่ยนแปลง, รายการที่ยังไม่คืน และรายการที่คืนแล้ว ตามลำดับ
+        # แถวจะถูกจัดรูปแบบเฉพาะตอนที่ถูกโหลดขึ้นมาแสดง
+        self.history_view.show_sections([
+            ([member], lambda m: (
+                datetime.now().strftime("%Y-%m-%d"),
+                "Info",
+                f"ID: {m.member_id}, Name: {m.name}, Contact: {m.contact_info}"
+            )),
+            # รายการประวัติอยู่ในรูป "[YYYY-MM-DD HH:MM:SS] ..."
+            (history["update_history"], lambda update: (update[1:11], "Update", update)),
+            (history["active_loans"], lambda loan: (
+                loan.loan_date,
+                "Active Loan",
+                f"{loan.publication.title} (Due: {loan.due_date})"
+            )),
+            (history["returned_loans"], lambda loan: (loan.loan_date, "Returned", loan.publication.title)),
+        ])
+
+    def create_diagnostics_tab(self, diagnostics_frame: ttk.Frame):
+        ttk.Label(diagnostics_frame, text="Diagnostics", font=("Arial", 14)).pack(pady=10)
+        self.instrumentation_var = tk.BooleanVar(value=instrumentation.enabled)
+        ttk.Checkbutton(diagnostics_frame, text="Record method timings", variable=self.instrumentation_var,
+                        command=self.toggle_instrumentation).pack(pady=5)
+        
+        buttons = ttk.Frame(diagnostics_frame)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="Refresh", command=self.show_diagnostics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Reset", command=self.reset_diagnostics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Save...", command=self.save_diagnostics).pack(side=tk.LEFT, padx=5)
+        
+        self.diagnostics_view = PagedTreeview(diagnostics_frame, DIAGNOSTIC_COLUMNS)
+        self.diagnostics_view.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    def toggle_instrumentation(self):
+        if self.instrumentation_var.get():
+            instrumentation.enable()
+        else:
+            instrumentation.disable()
+
+    def show_diagnostics(self):
+        self.diagnostics_view.show_sequence(
+            instrumentation.snapshot(), lambda row: tuple(row[name] for name, _, _ in DIAGNOSTIC_COLUMNS)
+        )
+
+    def reset_diagnostics(self):
+        instrumentation.reset()
+        self.diagnostics_view.clear()
+
+    def save_diagnostics(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            instrumentation.dump(path)
+        except OSError as e:
+            messagebox.showerror("Error", str(e))
+
+
+# วัด callback ของ GUI ด้วย (ห่อไว้ถาวรเพราะปุ่มเก็บ bound method ไว้ตั้งแต่สร้าง)
+instrumentation.register(LibraryApp, permanent=True)
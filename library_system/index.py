@@ -0,0 +1,111 @@
+import itertools
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from .models import Book, Publication
+
+
+# Class PublicationIndex - inverted index สำหรับค้นหาสิ่งพิมพ์ (word tokens + trigrams)
+
+class PublicationIndex:
+    FIELDS = ("title", "author", "genre")
+    _TOKEN_RE = re.compile(r"\w+")
+    _EMPTY: Set[int] = frozenset()
+
+    def __init__(self):
+        # index แยกตาม field โดยเก็บค่าที่ไม่ซ้ำกัน (แปลงเป็นตัวพิมพ์เล็กแล้ว) เพียงครั้งเดียว
+        # เพราะชื่อผู้แต่งและประเภทซ้ำกันมาก: trigrams/tokens ชี้ไปที่ value id
+        # และ value id ชี้ไปที่ตำแหน่งใน Library.publications
+        self._value_ids: Dict[str, Dict[str, int]] = {field: {} for field in self.FIELDS}
+        self._values: Dict[str, List[str]] = {field: [] for field in self.FIELDS}
+        self._value_positions: Dict[str, List[List[int]]] = {field: [] for field in self.FIELDS}
+        # value id ของแต่ละตำแหน่ง (genre ของสิ่งพิมพ์ที่ไม่ใช่ Book จะเป็น None)
+        self._position_values: Dict[str, List[Optional[int]]] = {field: [] for field in self.FIELDS}
+        self._trigrams: Dict[str, Dict[str, Set[int]]] = {field: {} for field in self.FIELDS}
+        self._tokens: Dict[str, Dict[str, Set[int]]] = {field: {} for field in self.FIELDS}
+
+    @staticmethod
+    def _field_value(publication: Publication, field: str) -> Optional[str]:
+        if field == "genre":
+            return publication.genre if isinstance(publication, Book) else None
+        return getattr(publication, field)
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _value_id(self, field: str, lowered: str) -> int:
+        value_id = self._value_ids[field].get(lowered)
+        if value_id is not None:
+            return value_id
+        # ค่าที่ยังไม่เคยเห็น: สร้าง trigrams และ tokens ครั้งเดียว
+        value_id = len(self._values[field])
+        self._value_ids[field][lowered] = value_id
+        self._values[field].append(lowered)
+        self._value_positions[field].append([])
+        for gram in self._grams(lowered):
+            self._trigrams[field].setdefault(gram, set()).add(value_id)
+        for token in self._TOKEN_RE.findall(lowered):
+            self._tokens[field].setdefault(token, set()).add(value_id)
+        return value_id
+
+    def add(self, publication: Publication) -> int:
+        # เพิ่มสิ่งพิมพ์เข้า index และคืนตำแหน่งของสิ่งพิมพ์นั้น
+        position = len(self._position_values["title"])
+        for field in self.FIELDS:
+            value = self._field_value(publication, field)
+            if value is None:
+                self._position_values[field].append(None)
+                continue
+            value_id = self._value_id(field, value.lower())
+            self._value_positions[field][value_id].append(position)
+            self._position_values[field].append(value_id)
+        return position
+
+    def _match_positions(self, term: str, field: str) -> Iterable[int]:
+        # ตำแหน่งของสิ่งพิมพ์ที่ field มี term เป็น substring (ไม่ซ้ำกัน เพราะแต่ละตำแหน่งมีค่าเดียวต่อ field)
+        values = self._values.get(field)
+        if values is None:
+            return ()
+        term = term.lower()
+        if len(term) < 3:
+            # คำสั้นกว่า trigram ต้องไล่ตรวจทุกค่าที่ไม่ซ้ำกัน
+            value_ids = [i for i, value in enumerate(values) if term in value]
+        else:
+            # เริ่ม intersect จาก posting list ที่สั้นที่สุดก่อน
+            postings = sorted((self._trigrams[field].get(gram, self._EMPTY) for gram in self._grams(term)), key=len)
+            if len(term) == 3:
+                # คำยาว 3 ตัวอักษรพอดี: อยู่ใน posting list ของ trigram นั้นก็คือเป็น substring แล้ว
+                # (คำที่ยาวกว่าแต่มี trigram เดียว เช่น "0000" ยังต้องตรวจซ้ำ)
+                value_ids = postings[0]
+            else:
+                candidates = postings[0].intersection(*postings[1:])
+                # trigrams ครบไม่ได้แปลว่าเป็น substring จริง จึงต้องตรวจซ้ำ
+                value_ids = [i for i in candidates if term in values[i]]
+        value_positions = self._value_positions[field]
+        return itertools.chain.from_iterable(value_positions[i] for i in value_ids)
+
+    def match(self, term: str, field: str) -> Set[int]:
+        # คืนตำแหน่งของสิ่งพิมพ์ที่ field มี term เป็น substring (ไม่สนใจตัวพิมพ์เล็ก/ใหญ่)
+        return set(self._match_positions(term, field))
+
+    def match_sorted(self, term: str, field: str) -> List[int]:
+        # เหมือน match แต่คืนเป็น list เรียงตามตำแหน่ง (ไม่ต้องสร้าง set)
+        return sorted(self._match_positions(term, field))
+
+    def refine(self, positions: List[int], term: str, field: str) -> List[int]:
+        # กรองผลการค้นหาเดิมให้เหลือเฉพาะตำแหน่งที่ field มี term (ใช้เมื่อ term ขยายจากคำค้นเดิม)
+        term = term.lower()
+        values = self._values[field]
+        position_values = self._position_values[field]
+        return [i for i in positions if term in values[position_values[i]]]
+
+    def score(self, position: int, term: str, field: str) -> int:
+        # ตรงทั้งหมด = 3, ตรงทั้งคำ = 2, เป็นส่วนหนึ่งของคำ = 1
+        term = term.lower()
+        value_id = self._position_values[field][position]
+        if self._values[field][value_id] == term:
+            return 3
+        if value_id in self._tokens[field].get(term, self._EMPTY):
+            return 2
+        return 1
@@ -0,0 +1,157 @@
+import json
+import math
+import threading
+import time
+import types
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from .models import CirculationResult
+
+
+# Instrumentation - วัดจำนวนครั้ง เวลา และขนาดผลลัพธ์ของ method (เปิด/ปิดได้ระหว่างทำงาน)
+
+class _LatencyHistogram:
+    # histogram แบบ log scale: 4 ช่องต่อการเพิ่มขึ้น 2 เท่า (หน่วยไมโครวินาที) ใช้หน่วยความจำคงที่
+    BUCKETS_PER_DOUBLING = 4
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+
+    def add(self, microseconds: float) -> None:
+        bucket = int(math.log2(microseconds) * self.BUCKETS_PER_DOUBLING) if microseconds > 1 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+
+    def percentile(self, p: float) -> float:
+        # ขอบบนของช่องที่มี percentile นี้ (ค่าประมาณ คลาดเคลื่อนไม่เกิน ~19%)
+        target = p * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return 2 ** ((bucket + 1) / self.BUCKETS_PER_DOUBLING)
+        return 0.0
+
+
+class _MethodStats:
+    __slots__ = ("calls", "errors", "total_us", "max_us", "histogram", "sized_calls", "total_size")
+
+    def __init__(self):
+        self.calls = 0
+        # จำนวนครั้งที่ method raise exception (นับรวมอยู่ใน calls และเวลาด้วย)
+        self.errors = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+        self.histogram = _LatencyHistogram()
+        # ขนาดผลลัพธ์ (len) นับเฉพาะการเรียกที่ผลลัพธ์มีขนาด
+        self.sized_calls = 0
+        self.total_size = 0
+
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _MethodStats] = {}
+        # class ที่ลงทะเบียนไว้ -> method เดิม (ใช้คืนค่าตอนปิด)
+        self._originals: Dict[type, Dict[str, Callable]] = {}
+
+    def register(self, cls: type, permanent: bool = False) -> type:
+        # วัด public methods ทั้งหมดของ cls
+        # ปกติจะสลับ method ของ class เมื่อเปิด/ปิด จึงไม่มีค่าใช้จ่ายเลยตอนปิด
+        # permanent=True ห่อ method ไว้ตลอดและตรวจ self.enabled ทุกครั้ง ใช้กับ class ที่ bound method
+        # ถูกเก็บไว้ล่วงหน้า (เช่น command ของปุ่มใน GUI) ซึ่งการสลับ method ทีหลังจะไม่มีผล
+        methods = {name: value for name, value in vars(cls).items()
+                   if not name.startswith("_") and isinstance(value, types.FunctionType)}
+        if permanent:
+            for name, func in methods.items():
+                setattr(cls, name, self._wrap(f"{cls.__name__}.{name}", func, check_enabled=True))
+        else:
+            self._originals[cls] = methods
+            if self.enabled:
+                self._patch(cls)
+        return cls
+
+    def _patch(self, cls: type) -> None:
+        for name, func in self._originals[cls].items():
+            setattr(cls, name, self._wrap(f"{cls.__name__}.{name}", func))
+
+    def enable(self) -> None:
+        if not self.enabled:
+            self.enabled = True
+            for cls in self._originals:
+                self._patch(cls)
+
+    def disable(self) -> None:
+        if self.enabled:
+            self.enabled = False
+            for cls, methods in self._originals.items():
+                for name, func in methods.items():
+                    setattr(cls, name, func)
+
+    def _wrap(self, name: str, func: Callable, check_enabled: bool = False) -> Callable:
+        def wrapper(*args, **kwargs):
+            if check_enabled and not self.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                # การเรียกที่ล้มเหลวต้องถูกนับด้วย ไม่อย่างนั้น desk ที่เจอ error จะไม่ปรากฏใน Diagnostics
+                self.record(name, time.perf_counter() - start, error=True)
+                raise
+            self.record(name, time.perf_counter() - start, result)
+            return result
+        wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = func.__name__, func.__doc__, func
+        return wrapper
+
+    def record(self, name: str, seconds: float, result: Any = None, error: bool = False) -> None:
+        # ขนาดผลลัพธ์นับเฉพาะผลที่เป็นชุดของรายการ (string และ dict สรุป เช่นรายงานหรือประวัติ ไม่นับ)
+        if isinstance(result, CirculationResult):
+            result = result.loans
+        size = len(result) if isinstance(result, (list, tuple, set, frozenset)) else None
+        microseconds = seconds * 1e6
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _MethodStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.total_us += microseconds
+            stats.max_us = max(stats.max_us, microseconds)
+            stats.histogram.add(microseconds)
+            if size is not None:
+                stats.sized_calls += 1
+                stats.total_size += size
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        # สรุปของแต่ละ method เรียงตามเวลารวมจากมากไปน้อย
+        with self._lock:
+            rows = [{
+                "method": name,
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "total_ms": round(stats.total_us / 1000, 3),
+                "mean_us": round(stats.total_us / stats.calls, 2),
+                "p50_us": round(stats.histogram.percentile(0.50), 2),
+                "p95_us": round(stats.histogram.percentile(0.95), 2),
+                "p99_us": round(stats.histogram.percentile(0.99), 2),
+                "max_us": round(stats.max_us, 2),
+                "mean_result_size": round(stats.total_size / stats.sized_calls, 2) if stats.sized_calls else None,
+            } for name, stats in self._stats.items()]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"dumped_at": datetime.now().isoformat(timespec="seconds"), "enabled": self.enabled,
+                       "methods": self.snapshot()}, f, indent=2)
+
+
+# ใช้ร่วมกันทั้งโปรแกรม: instrumentation.enable() / disable()
+instrumentation = Instrumentation()
@@ -0,0 +1,799 @@
+import bisect
+import contextlib
+import heapq
+import itertools
+import threading
+from collections import Counter, OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .index import PublicationIndex
+from .instrumentation import instrumentation
+from .models import (AlreadyLoanedError, AlreadyReservedError, Book, CirculationResult, LibraryError, LibraryEvent,
+                     Loan, Member, MemberNotFoundError, NoActiveLoanError, NoReservationError, Publication,
+                     PublicationNotFoundError, ReservedForAnotherMemberError)
+from .storage import LibraryStorage, LoanRow
+
+
+# Locks สำหรับโหมด thread-safe
+
+class _StripedLocks:
+    # กลุ่ม lock ที่เลือกตาม hash ของ key: key ต่างกันส่วนใหญ่ได้ lock คนละตัว แต่จำนวน lock คงที่
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def __call__(self, key: str) -> threading.RLock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    def many(self, keys: Iterable[str]) -> contextlib.ExitStack:
+        # ถือ lock ของหลาย key พร้อมกัน เรียงตามลำดับ stripe เสมอเพื่อไม่ให้เกิด deadlock ระหว่าง thread
+        stack = contextlib.ExitStack()
+        for i in sorted({hash(key) % len(self._locks) for key in keys}):
+            stack.enter_context(self._locks[i])
+        return stack
+
+
+class _NoLocks:
+    # ใช้แทน _StripedLocks เมื่อไม่ได้เปิดโหมด thread-safe
+    _NO_LOCK = contextlib.nullcontext()
+
+    def __call__(self, key: str) -> contextlib.nullcontext:
+        return self._NO_LOCK
+
+    def many(self, keys: Iterable[str]) -> contextlib.nullcontext:
+        return self._NO_LOCK
+
+# Class Library - คลาสหลักสำหรับจัดการระบบห้องสมุด
+
+class Library:
+    # จำนวนผลการค้นหาที่เก็บไว้ใน cache และขนาดสูงสุดของผลเดิมที่จะนำมากรองต่อแทนการค้นจาก index
+    SEARCH_CACHE_SIZE = 128
+    SEARCH_REFINE_LIMIT = 20000
+
+    def __init__(self, storage: Optional[LibraryStorage] = None, thread_safe: bool = False):
+        # สร้าง lists สำหรับเก็บข้อมูล
+        # ถ้ามี storage, self.loans จะมีเฉพาะรายการยืมที่โหลดเข้ามาในหน่วยความจำแล้ว
+        # (รายการที่คืนแล้วจากครั้งก่อนจะถูกโหลดเมื่อดูประวัติของสมาชิก)
+        self.members: List[Member] = []
+        self.publications: List[Publication] = []
+        self.loans: List[Loan] = []
+        self._storage = storage
+        # dict index สำหรับค้นหาแบบ O(1) (ต้องอัพเดทพร้อมกับ lists ด้านบนเสมอ)
+        self._members_by_id: Dict[str, Member] = {}
+        # ตำแหน่งใน self.members ของสมาชิกแต่ละ ID (ID ซ้ำได้) ใช้ลบสมาชิกโดยไม่ต้องสร้าง list ใหม่
+        self._member_positions: Dict[str, List[int]] = {}
+        self._publications_by_title: Dict[str, Publication] = {}
+        self._publications_by_isbn: Dict[str, Book] = {}
+        self._search_index = PublicationIndex()
+        # LRU cache ของผลการค้นหา: (คำค้นตัวพิมพ์เล็ก, search_type) -> ตำแหน่งที่เรียงแล้ว
+        self._search_cache: "OrderedDict[Tuple[str, str], List[int]]" = OrderedDict()
+        # index ของรายการยืมที่ยังไม่คืน (key = loan_id เรียงตามลำดับการยืม)
+        # รายการยืมที่ยังไม่คืนของแต่ละสิ่งพิมพ์ (ตำแหน่ง -> {หมายเลขเล่ม: loan}) และรายการยืมทั้งหมดของสมาชิกแต่ละคน
+        # ใช้ตำแหน่งใน self.publications เป็น key ไม่ใช่ชื่อ เพราะหลายฉบับพิมพ์ (ISBN ต่างกัน) อาจมีชื่อเดียวกัน
+        self._active_loans: Dict[int, Loan] = {}
+        self._publication_loans: Dict[int, Dict[int, Loan]] = {}
+        self._loans_by_member: Dict[str, List[Loan]] = {}
+        # คิวจองแบบ FIFO ของแต่ละสิ่งพิมพ์: ตำแหน่ง -> OrderedDict ของ member_id (ตรวจว่าอยู่ในคิวและหาคนแรกได้ใน O(1))
+        self._reservations: Dict[int, "OrderedDict[str, None]"] = {}
+        # รายการยืมที่ยังไม่คืน เรียงตามวันกำหนดคืน: (due_ordinal, ลำดับการยืม, loan)
+        self._open_by_due: List[Tuple[int, int, Loan]] = []
+        # ตัวนับที่อัพเดททุกครั้งที่ยืม/คืน เพื่อให้ dashboard อ่านสรุปได้ทันทีโดยไม่ต้องไล่รายการยืม
+        self._active_by_member: Counter = Counter()
+        self._active_by_genre: Counter = Counter()
+        self._active_by_author: Counter = Counter()
+        # จำนวนครั้งที่ถูกยืมของแต่ละชื่อ (รวมรายการที่คืนแล้ว) ถ้ามี storage จะนับจาก storage ครั้งแรกที่ต้องใช้
+        self._borrow_counts: Optional[Counter] = Counter() if storage is None else None
+        # ข้อความรายงานของแต่ละรายการยืมที่จัดรูปแบบแล้ว (key = loan_id)
+        # ถูกลบเมื่อสถานะการยืมหรือข้อมูลสมาชิกเปลี่ยน
+        self._report_lines: Dict[int, str] = {}
+        # ตำแหน่งของสิ่งพิมพ์ใน self.publications (key = id ของ object)
+        self._publication_positions: Dict[int, int] = {}
+        self._next_loan_id = 0
+        # สมาชิกที่โหลดประวัติการยืมเก่าจาก storage แล้ว
+        self._history_loaded: Set[str] = set()
+        # ผู้รับการแจ้งเตือนเมื่อข้อมูลเปลี่ยน (เช่น GUI)
+        self._listeners: List[Callable[[LibraryEvent], None]] = []
+        # โหมด thread-safe: lock ตามชื่อสิ่งพิมพ์และตาม member_id ทำให้การยืมคนละเล่มทำงานพร้อมกันได้
+        # ส่วน _state_lock ป้องกันโครงสร้างที่ใช้ร่วมกัน (lists, indexes, storage) และถือไว้สั้นๆ เท่านั้น
+        # _search_lock ป้องกันเฉพาะ search index และ cache การค้นหาจึงไม่บล็อกการยืม/คืน
+        # ลำดับการถือ lock: title -> member -> state -> search
+        if thread_safe:
+            self._title_locks = _StripedLocks()
+            self._member_locks = _StripedLocks()
+            self._state_lock = threading.RLock()
+            self._search_lock = threading.RLock()
+        else:
+            self._title_locks = self._member_locks = _NoLocks()
+            self._state_lock = self._search_lock = contextlib.nullcontext()
+        if storage is not None:
+            self._load_from_storage()
+
+    def _load_from_storage(self) -> None:
+        # โหลดสมาชิกและสิ่งพิมพ์ทั้งหมด แต่โหลดเฉพาะรายการยืมที่ยังไม่คืน
+        members: Dict[str, Member] = {}
+        for member, removed in self._storage.load_members():
+            members[member.member_id] = member
+            if not removed:
+                self._index_member(member)
+        for publication in self._storage.load_publications():
+            self._index_publication(publication)
+        for row in self._storage.load_loan_rows(returned=False):
+            self._index_loan(self._loan_from_row(row, members[row[1]]))
+        for position, member_id in self._storage.load_reservations():
+            self._reservations.setdefault(position, OrderedDict())[member_id] = None
+        self._next_loan_id = self._storage.next_loan_id()
+
+    def _loan_from_row(self, row: LoanRow, member: Member) -> Loan:
+        loan_id, _, position, loan_date, due_date, returned, copy_number = row
+        loan = Loan(member, self.publications[position], loan_date, due_date, loan_id=loan_id, copy_number=copy_number)
+        loan.returned = returned
+        return loan
+
+    def subscribe(self, listener: Callable[[LibraryEvent], None]) -> None:
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[LibraryEvent], None]) -> None:
+        self._listeners.remove(listener)
+
+    def _emit(self, kind: str, message: str, subject: Any = None) -> None:
+        # ไม่สร้าง event ถ้าไม่มีผู้รับ (เช่น ตอนรันจาก script)
+        if self._listeners:
+            event = LibraryEvent(kind, message, subject)
+            for listener in list(self._listeners):
+                listener(event)
+
+    def flush(self) -> None:
+        # เขียนการเปลี่ยนแปลงที่ค้างอยู่ลง storage
+        if self._storage is not None:
+            self._storage.flush()
+
+    def close(self) -> None:
+        if self._storage is not None:
+            self._storage.close()
+
+    def _index_member(self, member: Member) -> None:
+        self._member_positions.setdefault(member.member_id, []).append(len(self.members))
+        self.members.append(member)
+        # ถ้ามี ID ซ้ำ ให้ index ชี้ไปที่สมาชิกคนแรกเหมือนการค้นหาแบบเดิม
+        self._members_by_id.setdefault(member.member_id, member)
+
+    def _unindex_member(self, member_id: str) -> None:
+        # ลบสมาชิกทุกคนที่มี ID นี้ออกจาก self.members โดยย้ายสมาชิกคนสุดท้ายมาแทนที่ (O(1) ต่อคน)
+        # ลำดับใน self.members จึงอาจเปลี่ยนหลังการลบ
+        for position in sorted(self._member_positions.pop(member_id, ()), reverse=True):
+            last = self.members.pop()
+            if position < len(self.members):
+                self.members[position] = last
+                moved = self._member_positions[last.member_id]
+                moved[moved.index(len(self.members))] = position
+
+    def _index_publication(self, publication: Publication) -> int:
+        position = len(self.publications)
+        self.publications.append(publication)
+        self._publication_positions[id(publication)] = position
+        # เพิ่มเข้า self.publications ก่อน index เสมอ ตำแหน่งที่ค้นเจอจึงอ่านจาก list ได้โดยไม่ต้องถือ _state_lock
+        with self._search_lock:
+            self._search_index.add(publication)
+            self._search_cache.clear()
+        self._publications_by_title.setdefault(publication.title, publication)
+        if isinstance(publication, Book):
+            self._publications_by_isbn.setdefault(publication.ISBN, publication)
+        return position
+
+    def _index_loan(self, loan: Loan) -> None:
+        self.loans.append(loan)
+        self._loans_by_member.setdefault(loan.member.member_id, []).append(loan)
+        if self._borrow_counts is not None:
+            self._borrow_counts[loan.publication.title] += 1
+        if not loan.returned:
+            self._active_loans[loan.loan_id] = loan
+            self._publication_loans.setdefault(self._position(loan.publication), {})[loan.copy_number] = loan
+            bisect.insort(self._open_by_due, (loan.due_ordinal, loan.loan_id, loan))
+            self._count_active(loan, 1)
+
+    def _count_active(self, loan: Loan, delta: int) -> None:
+        # ปรับตัวนับรายการยืมที่ยังไม่คืน (ลบ key ที่เหลือ 0 ออกเพื่อไม่ให้ dict โตไม่สิ้นสุด)
+        publication = loan.publication
+        for counter, key in ((self._active_by_member, loan.member.member_id),
+                             (self._active_by_genre, getattr(publication, "genre", None)),
+                             (self._active_by_author, publication.author)):
+            counter[key] += delta
+            if counter[key] <= 0:
+                del counter[key]
+
+    def add_members(self, members: Iterable[Member]) -> int:
+        # เพิ่มสมาชิกหลายคนพร้อมกันโดยไม่แสดง dialog (ใช้กับการนำเข้าข้อมูล) คืนจำนวนที่เพิ่ม
+        count = 0
+        with self._state_lock:
+            for member in members:
+                self._index_member(member)
+                if self._storage is not None:
+                    self._storage.save_member(member)
+                count += 1
+        return count
+
+    def add_publications(self, publications: Iterable[Publication]) -> int:
+        count = 0
+        with self._state_lock:
+            for publication in publications:
+                self._check_copies(publication)
+                position = self._index_publication(publication)
+                if self._storage is not None:
+                    self._storage.save_publication(position, publication)
+                count += 1
+        return count
+
+    def add_loans(self, loans: Iterable[Loan]) -> int:
+        # เพิ่มรายการยืมที่ตรวจสอบแล้ว (เช่น จากการนำเข้าประวัติ) โดยกำหนด loan_id ให้ใหม่
+        count = 0
+        with self._state_lock:
+            for loan in loans:
+                loan.loan_id = self._next_loan_id
+                self._next_loan_id += 1
+                if not loan.returned:
+                    # ให้รายการที่ยังไม่คืนได้เล่มที่ว่างอยู่ (ผู้เรียกตรวจแล้วว่ายังมีเล่มว่าง)
+                    taken = self._publication_loans.get(self._position(loan.publication), ())
+                    loan.copy_number = next(n for n in itertools.count(1) if n not in taken)
+                self._index_loan(loan)
+                if self._storage is not None:
+                    self._storage.save_loan(loan, self._publication_positions[id(loan.publication)])
+                count += 1
+        return count
+
+    def add_member(self, member: Member) -> None:
+        # เพิ่มสมาชิกใหม่
+        with self._member_locks(member.member_id), self._state_lock:
+            self._index_member(member)
+            if self._storage is not None:
+                self._storage.save_member(member)
+        self._emit("member_added", f"Member {member.name} added successfully.", member)
+    
+    def remove_member(self, member_id: str) -> Member:
+        with self._member_locks(member_id), self._state_lock:
+            member = self._members_by_id.pop(member_id, None)
+            if member is None:
+                raise MemberNotFoundError("Member not found!")
+            self._unindex_member(member_id)
+            # ยกเลิกการจองของสมาชิกที่ถูกลบ เพื่อไม่ให้กันเล่มว่างไว้
+            for position in [p for p, queue in self._reservations.items() if member_id in queue]:
+                self._remove_reservation(position, member_id)
+            if self._storage is not None:
+                self._storage.remove_member(member_id)
+        self._emit("member_removed", "Member removed successfully.", member)
+        return member
+    
+    def update_member(self, member_id: str, name: str, contact_info: str) -> Member:
+        with self._member_locks(member_id):
+            member = self.find_member(member_id)
+            if not member:
+                raise MemberNotFoundError("Member not found!")
+            member.update_info(name, contact_info)
+            with self._state_lock:
+                # ข้อความรายงานที่มีชื่อสมาชิกเดิมต้องจัดรูปแบบใหม่
+                for loan in self._loans_by_member.get(member_id, ()):
+                    self._report_lines.pop(loan.loan_id, None)
+                if self._storage is not None:
+                    self._storage.save_member(member)
+        self._emit("member_updated", "Member information updated successfully.", member)
+        return member
+    
+    @staticmethod
+    def _check_copies(publication: Publication) -> None:
+        # สิ่งพิมพ์ต้องมีอย่างน้อย 1 เล่ม (เหมือนการตรวจตอนนำเข้าและ set_copies)
+        if publication.copies < 1:
+            raise ValueError(f"Invalid copies: {publication.copies!r}")
+
+    def add_publication(self, publication: Publication) -> None:
+        self._check_copies(publication)
+        with self._state_lock:
+            position = self._index_publication(publication)
+            if self._storage is not None:
+                self._storage.save_publication(position, publication)
+        self._emit("publication_added", f"Publication '{publication.title}' added successfully.", publication)
+    
+    def find_publications(self, search_term: str, search_type: str = "title",
+                          offset: int = 0, limit: Optional[int] = None) -> List[Publication]:
+        # ค้นหาสิ่งพิมพ์ที่ title/author/genre มี search_term อยู่ (ไม่สนใจตัวพิมพ์เล็ก/ใหญ่)
+        # โดยใช้ inverted index แทนการไล่ตรวจทุกรายการ ผลลัพธ์เรียงตามลำดับที่เพิ่มเข้าระบบ
+        # และเลือกเป็นหน้าได้ด้วย offset/limit; search_type ที่ไม่รู้จักจะได้ list ว่าง
+        with self._search_lock:
+            positions = self._search_positions(search_term.lower(), search_type)
+            stop = None if limit is None else offset + limit
+            return [self.publications[i] for i in positions[offset:stop]]
+
+    def count_publications(self, search_term: str, search_type: str = "title") -> int:
+        # จำนวนผลการค้นหา (ผลจะถูกเก็บใน cache ทำให้การดึงทีละหน้าต่อจากนี้เร็ว)
+        with self._search_lock:
+            return len(self._search_positions(search_term.lower(), search_type))
+
+    def _search_positions(self, term: str, search_type: str) -> List[int]:
+        key = (term, search_type)
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            self._search_cache.move_to_end(key)
+            return cached
+        
+        # ถ้าเคยค้นด้วยคำที่เป็นส่วนต้นของคำนี้ (เช่น พิมพ์เพิ่มทีละตัวอักษร) ให้กรองจากผลเดิม
+        # เว้นแต่ผลเดิมมีขนาดใหญ่จนการค้นจาก index เร็วกว่า
+        positions = None
+        if search_type in PublicationIndex.FIELDS:
+            for length in range(len(term) - 1, 0, -1):
+                previous = self._search_cache.get((term[:length], search_type))
+                if previous is not None:
+                    if len(previous) <= self.SEARCH_REFINE_LIMIT:
+                        positions = self._search_index.refine(previous, term, search_type)
+                    break
+        if positions is None:
+            positions = self._search_index.match_sorted(term, search_type)
+        
+        self._search_cache[key] = positions
+        if len(self._search_cache) > self.SEARCH_CACHE_SIZE:
+            self._search_cache.popitem(last=False)
+        return positions
+
+    def query_publications(self, terms: List[str], search_type: str = "title",
+                           operator: str = "and", limit: Optional[int] = 20) -> List[Publication]:
+        # ค้นหาด้วยหลายคำพร้อมกัน (operator = "and" หรือ "or")
+        # ผลลัพธ์เรียงตามคะแนนความตรง และตัดเหลือไม่เกิน limit รายการ (None = ไม่จำกัด)
+        terms = [t.lower() for t in terms if t.strip()]
+        if not terms:
+            return []
+        if operator.lower() not in ("and", "or"):
+            raise ValueError(f"Unknown operator: {operator}")
+        with self._search_lock:
+            matches = [self._search_index.match(t, search_type) for t in terms]
+            if operator.lower() == "and":
+                positions = set.intersection(*matches)
+            else:
+                positions = set.union(*matches)
+            
+            # ใช้ -position เป็นตัวตัดสินเมื่อคะแนนเท่ากัน (สิ่งพิมพ์ที่เพิ่มก่อนมาก่อน)
+            scored = (
+                (sum(self._search_index.score(i, t, search_type) for t, m in zip(terms, matches) if i in m), -i)
+                for i in positions
+            )
+            best = heapq.nlargest(limit, scored) if limit is not None else sorted(scored, reverse=True)
+            return [self.publications[-neg_position] for _, neg_position in best]
+    
+    def find_member(self, member_id: str) -> Optional[Member]:
+        # ค้นหาสมาชิกจาก dict index ถ้าไม่เจอจะคืนค่า None (เพราะใช้ Optional ใน type hint)
+        return self._members_by_id.get(member_id)
+
+    def find_publication_by_title(self, title: str) -> Optional[Publication]:
+        # ค้นหาสิ่งพิมพ์จากชื่อแบบตรงตัว (exact match)
+        return self._publications_by_title.get(title)
+
+    def find_publication_by_isbn(self, isbn: str) -> Optional[Book]:
+        # ค้นหาหนังสือจาก ISBN
+        return self._publications_by_isbn.get(isbn)
+    
+    # เมธอดด้านล่างรับชื่อ ISBN หรือ barcode (ใช้ ISBN เพื่อระบุฉบับพิมพ์เมื่อมีหลายฉบับชื่อเดียวกัน)
+
+    def get_active_loan(self, publication_title: str) -> Optional[Loan]:
+        # รายการยืมที่ยังไม่คืนของสิ่งพิมพ์นี้ที่ยืมไปก่อนสุด (ถ้ามี)
+        publication, _ = self._resolve_item(publication_title)
+        loans = self._publication_loans.get(self._position(publication)) if publication else None
+        return next(iter(loans.values())) if loans else None
+
+    def count_available(self, publication_title: str) -> int:
+        # จำนวนเล่มที่ว่างให้ยืม: จำนวนเล่มทั้งหมดลบด้วยรายการยืมที่ยังไม่คืน (O(1))
+        publication, _ = self._resolve_item(publication_title)
+        return self._available(publication) if publication else 0
+
+    def next_in_line(self, publication_title: str) -> Optional[Member]:
+        # สมาชิกคนแรกในคิวจองของสิ่งพิมพ์นี้ (O(1))
+        publication, _ = self._resolve_item(publication_title)
+        queue = self._reservations.get(self._position(publication)) if publication else None
+        return self._members_by_id.get(next(iter(queue))) if queue else None
+
+    def count_reservations(self, publication_title: str) -> int:
+        publication, _ = self._resolve_item(publication_title)
+        return len(self._reservations.get(self._position(publication), ())) if publication else 0
+
+    def _position(self, publication: Publication) -> int:
+        return self._publication_positions[id(publication)]
+
+    def _available(self, publication: Publication) -> int:
+        return publication.copies - len(self._publication_loans.get(self._position(publication), ()))
+
+    def iter_loan_rows(self) -> Iterator[LoanRow]:
+        # ไล่ข้อมูลการยืมทั้งหมด รวมถึงรายการที่ยังไม่ได้โหลดเข้าหน่วยความจำ
+        if self._storage is not None:
+            yield from self._storage.load_loan_rows()
+            return
+        with self._state_lock:
+            loans = list(self.loans)
+        for loan in loans:
+            yield (loan.loan_id, loan.member.member_id, self._publication_positions[id(loan.publication)],
+                   loan.loan_date, loan.due_date, loan.returned, loan.copy_number)
+
+    def _iter_loan_ordinals(self) -> Iterator[Tuple[str, int, int, int, bool]]:
+        # เหมือน iter_loan_rows แต่คืนวันที่เป็น ordinal: (member_id, ตำแหน่งสิ่งพิมพ์, loan, due, returned)
+        # ถ้าไม่มี storage จะอ่านจาก Loan โดยตรงโดยไม่ต้องแปลงวันที่เป็น string แล้วแปลงกลับ
+        if self._storage is None:
+            with self._state_lock:
+                loans = list(self.loans)
+            for loan in loans:
+                yield (loan.member.member_id, self._publication_positions[id(loan.publication)],
+                       loan.loan_ordinal, loan.due_ordinal, loan.returned)
+            return
+        # วันที่ซ้ำกันมาก จึงแปลง string เป็น ordinal ครั้งเดียวต่อวันที่
+        ordinals: Dict[str, int] = {}
+        for _, member_id, position, loan_date, due_date, returned, _ in self._storage.load_loan_rows():
+            for value in (loan_date, due_date):
+                if value not in ordinals:
+                    ordinals[value] = date.fromisoformat(value).toordinal()
+            yield member_id, position, ordinals[loan_date], ordinals[due_date], returned
+
+    def _check_borrow(self, member_id: str, publication: Publication) -> None:
+        # ตรวจว่ามีเล่มว่าง และเล่มที่ว่างไม่ได้ถูกจองไว้ให้สมาชิกคนอื่น
+        # ถ้ามีคิวจอง เล่มที่ว่าง n เล่มจะถูกกันไว้ให้ n คนแรกในคิว สมาชิกคนอื่นยืมได้เมื่อเล่มว่างมีมากกว่าคิว
+        available = self._available(publication)
+        if available <= 0:
+            raise AlreadyLoanedError("Publication is already loaned!" if publication.copies == 1
+                                     else "All copies are loaned!")
+        queue = self._reservations.get(self._position(publication))
+        if queue and len(queue) >= available and member_id not in itertools.islice(queue, available):
+            raise ReservedForAnotherMemberError("Publication is reserved for another member!")
+
+    def _create_loan(self, member: Member, publication: Publication, loan_date: str, due_date: str) -> Loan:
+        # ต้องถือ lock ของชื่อสิ่งพิมพ์และ _state_lock อยู่แล้ว และผ่าน _check_borrow แล้ว
+        # เลือกเล่มหมายเลขน้อยที่สุดที่ว่าง (ไล่ไม่เกินจำนวนเล่มของสิ่งพิมพ์นี้)
+        position = self._position(publication)
+        taken = self._publication_loans.get(position, ())
+        copy_number = next((n for n in range(1, publication.copies + 1) if n not in taken), None)
+        if copy_number is None:
+            raise AlreadyLoanedError("All copies are loaned!")
+        loan = Loan(member, publication, loan_date, due_date, loan_id=self._next_loan_id, copy_number=copy_number)
+        self._next_loan_id += 1
+        self._index_loan(loan)
+        if self._storage is not None:
+            self._storage.save_loan(loan, position)
+        # สมาชิกที่จองไว้ได้รับหนังสือแล้วจึงออกจากคิว
+        queue = self._reservations.get(position)
+        if queue and member.member_id in queue:
+            self._remove_reservation(position, member.member_id)
+        return loan
+
+    def _close_loan(self, loan: Loan) -> None:
+        # ต้องถือ lock ของชื่อสิ่งพิมพ์และ _state_lock อยู่แล้ว
+        del self._active_loans[loan.loan_id]
+        position = self._position(loan.publication)
+        publication_loans = self._publication_loans[position]
+        del publication_loans[loan.copy_number]
+        if not publication_loans:
+            del self._publication_loans[position]
+        loan.returned = True
+        self._remove_open_by_due(loan)
+        self._count_active(loan, -1)
+        self._report_lines.pop(loan.loan_id, None)
+        if self._storage is not None:
+            self._storage.mark_returned(loan.loan_id)
+
+    def _emit_reservation_ready(self, publication: Publication, freed: int = 1) -> None:
+        # แจ้งสมาชิกในคิวจองที่เพิ่งได้เล่มว่าง: เมื่อมีเล่มว่างเพิ่ม freed เล่ม
+        # สมาชิกลำดับที่ available - freed ถึง available - 1 คือคนที่ได้เล่มว่างใหม่
+        available = self._available(publication)
+        queue = self._reservations.get(self._position(publication))
+        if not queue or available <= 0:
+            return
+        for member_id in list(itertools.islice(queue, max(0, available - freed), available)):
+            member = self._members_by_id.get(member_id)
+            if member is not None:
+                self._emit("reservation_available",
+                           f"'{publication.title}' is now available for {member.name} ({member.member_id}).", member)
+
+    def borrow_publication(self, member_id: str, publication_title: str, loan_date: str, due_date: str) -> Loan:
+        # ถือ lock ของชื่อสิ่งพิมพ์ตลอดช่วงตรวจสอบและสร้างรายการยืม เพื่อไม่ให้ยืมเกินจำนวนเล่มที่มี
+        with self._title_locks(publication_title), self._member_locks(member_id):
+            # ค้นหาสมาชิกและหนังสือที่ต้องการยืม
+            member = self.find_member(member_id)
+            if not member:
+                raise MemberNotFoundError("Member not found!")
+            publication = self.find_publication_by_title(publication_title)
+            if not publication:
+                raise PublicationNotFoundError("Publication not found!")
+            
+            # ตรวจสอบเล่มว่างและคิวจองจากตัวนับ แล้วสร้างรายการยืมใหม่
+            self._check_borrow(member_id, publication)
+            with self._state_lock:
+                loan = self._create_loan(member, publication, loan_date, due_date)
+        self._emit("publication_borrowed", f"{member.name} borrowed '{publication.title}'.", loan)
+        return loan
+    
+    def _resolve_item(self, item: str) -> Tuple[Optional[Publication], Optional[int]]:
+        # แปลงชื่อ ISBN หรือ barcode ("ISBN#หมายเลขเล่ม") เป็น (สิ่งพิมพ์, หมายเลขเล่ม หรือ None)
+        publication = self._publications_by_title.get(item) or self._publications_by_isbn.get(item)
+        if publication is not None:
+            return publication, None
+        prefix, separator, copy_number = item.rpartition("#")
+        if separator and copy_number.isdigit():
+            publication = self._publications_by_isbn.get(prefix) or self._publications_by_title.get(prefix)
+            if publication is not None and 1 <= int(copy_number) <= publication.copies:
+                return publication, int(copy_number)
+        return None, None
+
+    def return_publication(self, publication_title: str) -> Loan:
+        # รับชื่อ ISBN หรือ barcode ของเล่ม ถ้าไม่ระบุเล่มจะคืนรายการที่ยืมไปก่อนสุดของชื่อนั้น
+        publication, copy_number = self._resolve_item(publication_title)
+        title = publication.title if publication else publication_title
+        with self._title_locks(title), self._state_lock:
+            loans = self._publication_loans.get(self._position(publication), {}) if publication else {}
+            loan = loans.get(copy_number) if copy_number else next(iter(loans.values()), None)
+            if not loan:
+                raise NoActiveLoanError("No active loan found for this publication!")
+            self._close_loan(loan)
+        self._emit("publication_returned", f"'{title}' returned successfully.", loan)
+        self._emit_reservation_ready(loan.publication)
+        return loan
+    
+    def reserve_publication(self, member_id: str, publication_title: str) -> int:
+        # เพิ่มสมาชิกต่อท้ายคิวจองของสิ่งพิมพ์นี้ คืนลำดับในคิว (เริ่มที่ 1)
+        publication, _ = self._resolve_item(publication_title)
+        if not publication:
+            raise PublicationNotFoundError("Publication not found!")
+        with self._title_locks(publication.title), self._member_locks(member_id):
+            member = self.find_member(member_id)
+            if not member:
+                raise MemberNotFoundError("Member not found!")
+            with self._state_lock:
+                queue = self._reservations.setdefault(self._position(publication), OrderedDict())
+                if member_id in queue:
+                    raise AlreadyReservedError("Member has already reserved this publication!")
+                queue[member_id] = None
+                if self._storage is not None:
+                    self._storage.save_reservation(self._position(publication), member_id)
+                position = len(queue)
+        self._emit("publication_reserved", f"{member.name} reserved '{publication.title}' (position {position}).",
+                   publication)
+        return position
+
+    def cancel_reservation(self, member_id: str, publication_title: str) -> None:
+        publication, _ = self._resolve_item(publication_title)
+        with self._title_locks(publication.title if publication else publication_title), self._state_lock:
+            if not publication or member_id not in self._reservations.get(self._position(publication), ()):
+                raise NoReservationError("No reservation found for this member!")
+            self._remove_reservation(self._position(publication), member_id)
+        self._emit("reservation_cancelled", f"Reservation for '{publication.title}' cancelled.", publication)
+
+    def _remove_reservation(self, position: int, member_id: str) -> None:
+        queue = self._reservations[position]
+        del queue[member_id]
+        if not queue:
+            del self._reservations[position]
+        if self._storage is not None:
+            self._storage.remove_reservation(position, member_id)
+
+    def set_copies(self, publication_title: str, copies: int) -> Publication:
+        # เปลี่ยนจำนวนเล่มของสิ่งพิมพ์ (ต้องไม่น้อยกว่าหมายเลขเล่มที่ถูกยืมอยู่)
+        publication, _ = self._resolve_item(publication_title)
+        if not publication:
+            raise PublicationNotFoundError("Publication not found!")
+        with self._title_locks(publication.title), self._state_lock:
+            if copies < max(self._publication_loans.get(self._position(publication), ()), default=1):
+                raise ValueError(f"Cannot reduce '{publication.title}' to {copies} copies while copies are on loan")
+            added = copies - publication.copies
+            publication.copies = copies
+            if self._storage is not None:
+                self._storage.save_publication(self._position(publication), publication)
+        if added > 0:
+            self._emit_reservation_ready(publication, added)
+        return publication
+
+    def _resolve_publications(self, items: List[str]) -> List[Tuple[str, Optional[Publication], Optional[int]]]:
+        # แปลงแต่ละรายการ (ชื่อ ISBN หรือ barcode) เป็น (รายการเดิม, สิ่งพิมพ์, หมายเลขเล่ม)
+        return [(item, *self._resolve_item(item)) for item in items]
+
+    def borrow_publications(self, member_id: str, items: List[str], loan_date: str, due_date: str,
+                            atomic: bool = True) -> CirculationResult:
+        # ยืมหลายรายการ (ชื่อหรือ ISBN) ให้สมาชิกคนเดียวในครั้งเดียว
+        # atomic=True: ถ้ามีรายการใดยืมไม่ได้จะไม่ยืมเลยสักรายการ; atomic=False: ยืมเฉพาะรายการที่ยืมได้
+        result = CirculationResult()
+        member = self.find_member(member_id)
+        if not member:
+            raise MemberNotFoundError("Member not found!")
+        resolved = self._resolve_publications(items)
+        titles = [publication.title for _, publication, _ in resolved if publication]
+        with self._title_locks.many(titles), self._member_locks(member_id):
+            accepted: List[Publication] = []
+            seen: Set[int] = set()
+            for item, publication, _ in resolved:
+                if not publication:
+                    result.errors.append((item, "Publication not found!"))
+                    continue
+                if id(publication) in seen:
+                    result.errors.append((item, "Publication is listed more than once!"))
+                    continue
+                try:
+                    self._check_borrow(member_id, publication)
+                except LibraryError as e:
+                    result.errors.append((item, str(e)))
+                    continue
+                seen.add(id(publication))
+                accepted.append(publication)
+            if atomic and result.errors:
+                return result
+            
+            with self._state_lock:
+                for publication in accepted:
+                    result.loans.append(self._create_loan(member, publication, loan_date, due_date))
+        if result.loans:
+            self._emit("publications_borrowed", f"{member.name} borrowed {len(result.loans)} publications.", result)
+        return result
+
+    def return_publications(self, items: List[str], atomic: bool = False) -> CirculationResult:
+        # คืนหลายรายการ (ชื่อ ISBN หรือ barcode) ในครั้งเดียว เช่น จากตู้รับคืนหนังสือ
+        # ค่าเริ่มต้นคืนทุกรายการที่คืนได้และรายงานรายการที่ผิดพลาด; atomic=True จะไม่คืนเลยถ้ามีรายการผิดพลาด
+        result = CirculationResult()
+        resolved = self._resolve_publications(items)
+        titles = [publication.title for _, publication, _ in resolved if publication]
+        with self._title_locks.many(titles), self._state_lock:
+            accepted: Dict[int, Loan] = {}
+            for item, publication, copy_number in resolved:
+                loans = self._publication_loans.get(self._position(publication), {}) if publication else {}
+                if copy_number:
+                    loan = loans.get(copy_number)
+                else:
+                    # ชื่อเดียวกันหลายครั้งในชุดเดียวกัน = คืนหลายเล่ม
+                    loan = next((l for l in loans.values() if l.loan_id not in accepted), None)
+                if not loan or loan.loan_id in accepted:
+                    result.errors.append((item, "No active loan found for this publication!"))
+                else:
+                    accepted[loan.loan_id] = loan
+            if atomic and result.errors:
+                return result
+            
+            for loan in accepted.values():
+                self._close_loan(loan)
+                result.loans.append(loan)
+        if result.loans:
+            self._emit("publications_returned", f"{len(result.loans)} publications returned successfully.", result)
+            returned = Counter(id(loan.publication) for loan in result.loans)
+            for publication in {id(loan.publication): loan.publication for loan in result.loans}.values():
+                self._emit_reservation_ready(publication, returned[id(publication)])
+        return result
+
+    def _remove_open_by_due(self, loan: Loan) -> None:
+        # loan_id ไม่ซ้ำกัน จึงหาตำแหน่งของ (due_ordinal, loan_id) ได้ตรงๆ ด้วย binary search
+        # (ไม่ต้องไล่ทุกรายการที่มีวันกำหนดคืนเดียวกัน ซึ่งเป็นกรณีปกติของการยืมในวันเดียวกัน)
+        i = bisect.bisect_left(self._open_by_due, (loan.due_ordinal, loan.loan_id))
+        if i < len(self._open_by_due) and self._open_by_due[i][2] is loan:
+            del self._open_by_due[i]
+
+    def _open_by_due_range(self, first_ordinal: int, end_ordinal: int) -> Tuple[int, int]:
+        # ช่วง index ใน self._open_by_due ที่ first_ordinal <= due_ordinal < end_ordinal
+        lo = bisect.bisect_left(self._open_by_due, (first_ordinal,))
+        hi = bisect.bisect_left(self._open_by_due, (end_ordinal,))
+        return lo, hi
+
+    def _open_loans_between(self, first_ordinal: int, end_ordinal: int,
+                            offset: int = 0, limit: Optional[int] = None) -> List[Loan]:
+        # รายการยืมที่ยังไม่คืนซึ่ง first_ordinal <= due_ordinal < end_ordinal (เลือกเป็นหน้าได้ด้วย offset/limit)
+        with self._state_lock:
+            lo, hi = self._open_by_due_range(first_ordinal, end_ordinal)
+            lo += offset
+            if limit is not None:
+                hi = min(hi, lo + limit)
+            return [entry[2] for entry in self._open_by_due[lo:hi]]
+
+    def get_overdue_loans(self, as_of: Optional[date] = None,
+                          offset: int = 0, limit: Optional[int] = None) -> List[Loan]:
+        # รายการยืมที่ยังไม่คืนและเลยวันกำหนดคืนแล้ว ณ วันที่ as_of (ค่าเริ่มต้นคือวันนี้)
+        as_of = as_of or date.today()
+        return self._open_loans_between(0, as_of.toordinal(), offset, limit)
+
+    def count_overdue_loans(self, as_of: Optional[date] = None) -> int:
+        as_of = as_of or date.today()
+        with self._state_lock:
+            lo, hi = self._open_by_due_range(0, as_of.toordinal())
+        return hi - lo
+
+    def get_active_loans(self, offset: int = 0, limit: Optional[int] = None) -> List[Loan]:
+        # รายการยืมที่ยังไม่คืนเรียงตามลำดับการยืม (เลือกเป็นหน้าได้ด้วย offset/limit)
+        stop = None if limit is None else offset + limit
+        with self._state_lock:
+            return list(itertools.islice(self._active_loans.values(), offset, stop))
+
+    def count_active_loans(self) -> int:
+        return len(self._active_loans)
+
+    def get_loans_due_within(self, days: int, start: Optional[date] = None) -> List[Loan]:
+        # รายการยืมที่ต้องคืนภายใน days วันนับจาก start (รวมวัน start และวันสุดท้าย)
+        start = start or date.today()
+        return self._open_loans_between(start.toordinal(), start.toordinal() + days + 1)
+
+    def count_member_active_loans(self, member_id: str) -> int:
+        return self._active_by_member.get(member_id, 0)
+
+    def active_loans_by_genre(self) -> Dict[str, int]:
+        with self._state_lock:
+            return dict(self._active_by_genre)
+
+    def active_loans_by_author(self) -> Dict[str, int]:
+        with self._state_lock:
+            return dict(self._active_by_author)
+
+    def most_borrowed_titles(self, limit: int = 10) -> List[Tuple[str, int]]:
+        # ชื่อที่ถูกยืมบ่อยที่สุด (รวมรายการที่คืนแล้ว) เรียงจากมากไปน้อย
+        with self._state_lock:
+            if self._borrow_counts is not None:
+                return self._borrow_counts.most_common(limit)
+            cutoff = self._next_loan_id
+        # ครั้งแรกต้องนับจาก storage ทั้งตาราง จึงนับนอก _state_lock เพื่อไม่ให้การยืม/คืนต้องรอ
+        # นับเฉพาะรายการก่อน cutoff รายการที่สร้างระหว่างนับอยู่ท้าย self.loans และนับเพิ่มตอนสลับเข้าไป
+        counts = Counter(self.publications[row[2]].title for row in self.iter_loan_rows() if row[0] < cutoff)
+        with self._state_lock:
+            if self._borrow_counts is None:
+                for loan in reversed(self.loans):
+                    if loan.loan_id < cutoff:
+                        break
+                    counts[loan.publication.title] += 1
+                self._borrow_counts = counts
+            return self._borrow_counts.most_common(limit)
+
+    def get_loan_statistics(self, as_of: Optional[date] = None) -> Dict[str, Any]:
+        # สรุปสำหรับ dashboard: อ่านจากตัวนับที่อัพเดทอยู่แล้ว
+        return {
+            "active": self.count_active_loans(),
+            "overdue": self.count_overdue_loans(as_of),
+            "members_with_loans": len(self._active_by_member),
+            "by_genre": self.active_loans_by_genre(),
+            "by_author": self.active_loans_by_author(),
+            "most_borrowed": self.most_borrowed_titles(),
+        }
+
+    def _report_line(self, loan: Loan) -> str:
+        line = self._report_lines.get(loan.loan_id)
+        if line is None:
+            line = self._report_lines[loan.loan_id] = loan.display_loan()
+        return line
+
+    def generate_overdue_report(self) -> str:
+        # กรองรายการยืมที่ยังไม่คืนและวันที่กำหนดคืนน้อยกว่าวันที่ปัจจุบัน
+        overdue_loans = self.get_overdue_loans()
+        # แสดงผลในรูปแบบข้อความ ถ้าไม่มีรายการเกินกำหนดจะแสดง "No overdue loans."
+        return "\n".join([self._report_line(loan) for loan in overdue_loans]) if overdue_loans else "No overdue loans."
+    
+    def generate_loan_report(self) -> str:
+        active_loans = self.get_active_loans()
+        return "\n".join([self._report_line(loan) for loan in active_loans]) if active_loans else "No active loans."
+
+    def _member_loans(self, member: Member) -> List[Loan]:
+        loans = self._loans_by_member.get(member.member_id, [])
+        if self._storage is not None and member.member_id not in self._history_loaded:
+            # โหลดรายการที่คืนแล้วจาก storage ครั้งแรกที่ต้องใช้ (ข้ามรายการที่อยู่ในหน่วยความจำแล้ว)
+            self._history_loaded.add(member.member_id)
+            known = {loan.loan_id for loan in loans}
+            older = [
+                self._loan_from_row(row, member)
+                for row in self._storage.load_loan_rows(member_id=member.member_id, returned=True)
+                if row[0] not in known
+            ]
+            if older:
+                loans = sorted(older + loans, key=lambda loan: loan.loan_id)
+                self._loans_by_member[member.member_id] = loans
+        return loans
+
+    def get_member_history(self, member_id: str) -> Dict:
+        """รับประวัติทั้งหมดของสมาชิก"""
+        member = self.find_member(member_id)
+        if not member:
+            return None
+        
+        # รวบรวมประวัติการยืม-คืนจาก index ของสมาชิก
+        with self._member_locks(member_id):
+            loan_history = list(self._member_loans(member))
+        
+        # แยกเป็นรายการที่ยังไม่คืนและคืนแล้ว
+        active_loans = [loan for loan in loan_history if not loan.returned]
+        returned_loans = [loan for loan in loan_history if loan.returned]
+        
+        return {
+            "member": member,
+            "active_loans": active_loans,
+            "returned_loans": returned_loans,
+            "update_history": member.update_history
+        }
+
+
+instrumentation.register(Library)
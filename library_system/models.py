@@ -0,0 +1,192 @@
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+
+
+# Class Member - คลาสสำหรับจัดการข้อมูลสมาชิก
+
+class Member:
+    # ใช้ __slots__ เพื่อไม่ต้องมี __dict__ ในทุก object (ประหยัดหน่วยความจำเมื่อมีข้อมูลจำนวนมาก)
+    __slots__ = ("member_id", "name", "contact_info", "update_history")
+
+    def __init__(self, member_id: str, name: str, contact_info: str):
+        # เก็บข้อมูลพื้นฐานของสมาชิก
+        self.member_id = member_id
+        self.name = name
+        self.contact_info = contact_info
+        # เพิ่มประวัติการเปลี่ยนแปลงข้อมูล
+        self.update_history: List[str] = []
+
+    def display_info(self) -> str:
+        # แสดงข้อมูลสมาชิกในรูปแบบข้อความ
+        return f"Member ID: {self.member_id}, Name: {self.name}, Contact: {self.contact_info}"
+    
+    def update_info(self, name: str, contact_info: str) -> None:
+        # บันทึกประวัติการเปลี่ยนแปลง
+        changes = []
+        if self.name != name:
+            changes.append(f"Name: {self.name} -> {name}")
+            self.name = name
+        if self.contact_info != contact_info:
+            changes.append(f"Contact: {self.contact_info} -> {contact_info}")
+            self.contact_info = contact_info
+        
+        if changes:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.update_history.append(f"[{timestamp}] " + ", ".join(changes))
+
+
+# Abstract Class Publication - คลาสแม่สำหรับสิ่งพิมพ์ทุกประเภท
+
+class Publication(ABC):
+    __slots__ = ("title", "author", "year", "copies")
+
+    def __init__(self, title: str, author: str, year: int, copies: int = 1):
+        # ข้อมูลพื้นฐานของสิ่งพิมพ์
+        self.title = title
+        self.author = author
+        self.year = year
+        # จำนวนเล่มที่ห้องสมุดมี (แต่ละเล่มมีหมายเลข 1..copies)
+        self.copies = copies
+    
+    def barcode(self, copy_number: int) -> str:
+        # barcode ของแต่ละเล่ม: รหัสของสิ่งพิมพ์ตามด้วย "#" และหมายเลขเล่ม
+        return f"{self.title}#{copy_number}"
+    
+    @abstractmethod
+    def display(self) -> str:
+        # Method ที่ต้องถูก implement โดย child class
+        pass
+
+    @abstractmethod
+    def get_type(self) -> str:
+        # Method สำหรับระบุประเภทของสิ่งพิมพ์
+        pass
+
+
+# Class Book - คลาสสำหรับจัดการหนังสือ (สืบทอดจาก Publication)
+
+class Book(Publication):
+    __slots__ = ("ISBN", "genre")
+
+    def __init__(self, title: str, author: str, year: int, ISBN: str, genre: str, copies: int = 1):
+        # เรียกใช้ constructor ของ parent class
+        super().__init__(title, author, year, copies)
+        # เพิ่มข้อมูลเฉพาะของหนังสือ
+        self.ISBN = ISBN
+        self.genre = genre
+    
+    def display(self) -> str:
+        # แสดงข้อมูลหนังสือ (override method จาก Publication)
+        return f"Book: {self.title} by {self.author} ({self.year}), Genre: {self.genre}, ISBN: {self.ISBN}"
+    
+    def get_type(self) -> str:
+        return "Book"
+
+    def barcode(self, copy_number: int) -> str:
+        return f"{self.ISBN}#{copy_number}"
+
+
+# Class Loan - คลาสสำหรับจัดการการยืม-คืน
+
+class Loan:
+    __slots__ = ("loan_id", "member", "publication", "copy_number", "loan_ordinal", "due_ordinal", "returned")
+
+    def __init__(self, member: Member, publication: Publication, loan_date: str, due_date: str,
+                 loan_id: Optional[int] = None, copy_number: int = 1):
+        # เก็บข้อมูลการยืม (loan_id และหมายเลขเล่มถูกกำหนดโดย Library)
+        self.loan_id = loan_id
+        self.member = member
+        self.publication = publication
+        self.copy_number = copy_number
+        # เก็บวันที่เป็นตัวเลข ordinal แทน string "YYYY-MM-DD" เพื่อประหยัดหน่วยความจำ
+        # และไม่ต้อง parse ซ้ำทุกครั้งที่ออกรายงาน
+        self.loan_ordinal = date.fromisoformat(loan_date).toordinal()
+        self.due_ordinal = date.fromisoformat(due_date).toordinal()
+        self.returned = False  # สถานะการคืน
+
+    @property
+    def barcode(self) -> str:
+        return self.publication.barcode(self.copy_number)
+
+    @property
+    def loan_date(self) -> str:
+        return date.fromordinal(self.loan_ordinal).isoformat()
+
+    @loan_date.setter
+    def loan_date(self, value: str) -> None:
+        self.loan_ordinal = date.fromisoformat(value).toordinal()
+
+    @property
+    def due_date(self) -> str:
+        return date.fromordinal(self.due_ordinal).isoformat()
+
+    @due_date.setter
+    def due_date(self, value: str) -> None:
+        # หมายเหตุ: Library เรียงรายการยืมที่ยังไม่คืนตาม due_ordinal ไว้ จึงไม่ควรแก้ค่านี้หลังยืมแล้ว
+        self.due_ordinal = date.fromisoformat(value).toordinal()
+    
+    def display_loan(self) -> str:
+        # แสดงข้อมูลการยืมพร้อมสถานะ
+        status = "Returned" if self.returned else "Active"
+        return f"{self.publication.display()} loaned to {self.member.name} from {self.loan_date} to {self.due_date} - {status}"
+
+
+# Exceptions และ Events - ให้ Library ทำงานได้โดยไม่ต้องมี GUI
+
+class LibraryError(Exception):
+    # คลาสแม่ของข้อผิดพลาดทั้งหมดจาก Library (ข้อความใช้แสดงให้ผู้ใช้เห็นได้เลย)
+    pass
+
+
+class MemberNotFoundError(LibraryError):
+    pass
+
+
+class PublicationNotFoundError(LibraryError):
+    pass
+
+
+class AlreadyLoanedError(LibraryError):
+    pass
+
+
+class ReservedForAnotherMemberError(LibraryError):
+    pass
+
+
+class AlreadyReservedError(LibraryError):
+    pass
+
+
+class NoReservationError(LibraryError):
+    pass
+
+
+class NoActiveLoanError(LibraryError):
+    pass
+
+
+class LibraryEvent:
+    def __init__(self, kind: str, message: str, subject: Any = None):
+        # kind เช่น "member_added", "publication_borrowed"; subject คือ object ที่เปลี่ยนแปลง
+        self.kind = kind
+        self.message = message
+        self.subject = subject
+
+
+class CirculationResult:
+    # ผลของการยืม/คืนหลายรายการในครั้งเดียว
+    def __init__(self):
+        self.loans: List[Loan] = []
+        # รายการที่ทำไม่สำเร็จ: (ชื่อหรือ ISBN ที่ส่งมา, ข้อความ)
+        self.errors: List[Tuple[str, str]] = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def summary(self) -> str:
+        lines = [f"{len(self.loans)} succeeded, {len(self.errors)} failed."]
+        lines += [f"{item}: {message}" for item, message in self.errors]
+        return "\n".join(lines)
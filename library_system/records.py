@@ -0,0 +1,201 @@
+import csv
+import itertools
+import json
+from datetime import date
+from collections import Counter
+from typing import Iterator, List, Optional, Tuple
+
+from .library import Library
+from .models import Book, Loan, Member
+
+
+# Bulk Import/Export - นำเข้า/ส่งออกข้อมูลจำนวนมากเป็นไฟล์ CSV หรือ JSON Lines (.jsonl)
+
+RECORD_FIELDS = {
+    "publications": ["title", "author", "year", "isbn", "genre", "copies"],
+    "members": ["member_id", "name", "contact_info"],
+    "loans": ["member_id", "isbn", "title", "loan_date", "due_date", "returned"],
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        # ข้อผิดพลาดของแต่ละแถว: (หมายเลขบรรทัดในไฟล์, ข้อความ)
+        self.errors: List[Tuple[int, str]] = []
+
+    def summary(self, max_errors: int = 20) -> str:
+        lines = [f"Imported {self.imported} records, {len(self.errors)} errors."]
+        lines += [f"Line {line_no}: {message}" for line_no, message in self.errors[:max_errors]]
+        if len(self.errors) > max_errors:
+            lines.append(f"... and {len(self.errors) - max_errors} more")
+        return "\n".join(lines)
+
+
+def _read_records(path: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    # อ่านไฟล์ทีละแถวด้วย generator: คืน (หมายเลขบรรทัด, record, ข้อความ error)
+    if path.lower().endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_no, None, f"Invalid JSON: {e}"
+                    continue
+                if isinstance(record, dict):
+                    yield line_no, record, None
+                else:
+                    yield line_no, None, "Expected a JSON object"
+    elif path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record, None
+    else:
+        raise ValueError(f"Unsupported file format: {path}")
+
+
+def _field(record: dict, name: str, required: bool = True) -> str:
+    value = record.get(name)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f"Missing field '{name}'")
+    return value
+
+
+def _parse_member(library: "Library", record: dict, seen: Counter) -> Member:
+    member_id = _field(record, "member_id")
+    if member_id in seen or library.find_member(member_id):
+        raise ValueError(f"Duplicate member ID '{member_id}'")
+    seen[member_id] += 1
+    return Member(member_id, _field(record, "name"), _field(record, "contact_info", required=False))
+
+
+def _parse_publication(library: "Library", record: dict, seen: Counter) -> Book:
+    year = _field(record, "year")
+    if not year.lstrip("-").isdigit():
+        raise ValueError(f"Invalid year: {year!r}")
+    isbn = _field(record, "isbn")
+    if isbn in seen or library.find_publication_by_isbn(isbn):
+        raise ValueError(f"Duplicate ISBN '{isbn}'")
+    seen[isbn] += 1
+    copies = _field(record, "copies", required=False) or "1"
+    if not copies.isdigit() or int(copies) < 1:
+        raise ValueError(f"Invalid copies: {copies!r}")
+    return Book(_field(record, "title"), _field(record, "author"), int(year), isbn,
+                _field(record, "genre", required=False), int(copies))
+
+
+def _parse_loan(library: "Library", record: dict, seen: Counter) -> Loan:
+    member_id = _field(record, "member_id")
+    member = library.find_member(member_id)
+    if member is None:
+        raise ValueError(f"Unknown member '{member_id}'")
+    isbn = _field(record, "isbn", required=False)
+    if isbn:
+        publication = library.find_publication_by_isbn(isbn)
+    else:
+        publication = library.find_publication_by_title(_field(record, "title"))
+    if publication is None:
+        raise ValueError(f"Unknown publication '{isbn or record.get('title')}'")
+    returned = _field(record, "returned", required=False).lower()
+    if returned not in ("", "true", "false", "1", "0", "yes", "no"):
+        raise ValueError(f"Invalid returned flag: {returned!r}")
+    loan_date = _field(record, "loan_date")
+    date.fromisoformat(loan_date)  # ตรวจสอบรูปแบบวันที่ (ValueError ถ้าไม่ถูกต้อง)
+    loan = Loan(member, publication, loan_date, _field(record, "due_date"))
+    loan.returned = returned in ("true", "1", "yes")
+    if not loan.returned:
+        # รายการที่ยังไม่คืนต้องไม่เกินจำนวนเล่มที่ว่าง นับรวมรายการก่อนหน้าใน chunk เดียวกันที่ยังไม่ได้เพิ่มเข้า library
+        # (chunk ก่อนหน้าถูกเพิ่มแล้วจึงนับอยู่ใน count_available แล้ว)
+        # นับแยกตามฉบับพิมพ์ (ISBN) เพราะหลายฉบับอาจมีชื่อเดียวกัน
+        key = f"{publication.ISBN}#open"
+        if seen[key] >= library.count_available(publication.ISBN):
+            raise ValueError(f"Publication '{publication.title}' is already loaned")
+        seen[key] += 1
+    return loan
+
+
+_RECORD_PARSERS = {
+    "publications": (_parse_publication, "add_publications"),
+    "members": (_parse_member, "add_members"),
+    "loans": (_parse_loan, "add_loans"),
+}
+
+
+def import_records(library: "Library", path: str, kind: str, chunk_size: int = 1000) -> ImportReport:
+    # นำเข้าข้อมูลแบบ streaming: อ่านและตรวจสอบทีละ chunk แล้วเพิ่มเข้า library ครั้งละ chunk
+    # หน่วยความจำที่ใช้จึงขึ้นกับ chunk_size ไม่ใช่ขนาดไฟล์
+    if kind not in _RECORD_PARSERS:
+        raise ValueError(f"Unknown record kind: {kind}")
+    parse, add_method = _RECORD_PARSERS[kind]
+    report = ImportReport()
+    rows = _read_records(path)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        # คีย์ที่พบใน chunk นี้ (chunk ก่อนหน้าถูกเพิ่มเข้า library แล้วจึงตรวจซ้ำจาก library ได้)
+        seen: Counter = Counter()
+        valid = []
+        for line_no, record, error in chunk:
+            if error is None:
+                try:
+                    valid.append(parse(library, record, seen))
+                    continue
+                except ValueError as e:
+                    error = str(e)
+            report.errors.append((line_no, error))
+        report.imported += getattr(library, add_method)(valid)
+    library.flush()
+    return report
+
+
+def _export_publications(library: "Library") -> Iterator[dict]:
+    for p in library.publications:
+        yield {"title": p.title, "author": p.author, "year": p.year,
+               "isbn": getattr(p, "ISBN", ""), "genre": getattr(p, "genre", ""), "copies": p.copies}
+
+
+def _export_members(library: "Library") -> Iterator[dict]:
+    for m in library.members:
+        yield {"member_id": m.member_id, "name": m.name, "contact_info": m.contact_info}
+
+
+def _export_loans(library: "Library") -> Iterator[dict]:
+    for _, member_id, position, loan_date, due_date, returned, _ in library.iter_loan_rows():
+        p = library.publications[position]
+        yield {"member_id": member_id, "isbn": getattr(p, "ISBN", ""), "title": p.title,
+               "loan_date": loan_date, "due_date": due_date, "returned": returned}
+
+
+_RECORD_EXPORTERS = {
+    "publications": _export_publications,
+    "members": _export_members,
+    "loans": _export_loans,
+}
+
+
+def export_records(library: "Library", path: str, kind: str) -> int:
+    # ส่งออกข้อมูลทีละแถวลงไฟล์ คืนจำนวนแถวที่เขียน
+    if kind not in _RECORD_EXPORTERS:
+        raise ValueError(f"Unknown record kind: {kind}")
+    records = _RECORD_EXPORTERS[kind](library)
+    count = 0
+    if path.lower().endswith(".jsonl"):
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+    elif path.lower().endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS[kind])
+            writer.writeheader()
+            for record in records:
+                writer.writerow(record)
+                count += 1
+    else:
+        raise ValueError(f"Unsupported file format: {path}")
+    return count
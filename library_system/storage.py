@@ -0,0 +1,466 @@
+from abc import ABC, abstractmethod
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .models import Book, Loan, Member, Publication
+
+
+# Class LibraryStorage - คลาสแม่สำหรับที่เก็บข้อมูลถาวรของ Library
+
+# แถวข้อมูลการยืม: (loan_id, member_id, ตำแหน่งสิ่งพิมพ์, loan_date, due_date, returned, หมายเลขเล่ม)
+LoanRow = Tuple[int, str, int, str, str, bool, int]
+
+
+class LibraryStorage(ABC):
+    @abstractmethod
+    def load_members(self) -> Iterator[Tuple[Member, bool]]:
+        # คืน (member, removed) ของสมาชิกทุกคน รวมถึงคนที่ถูกลบไปแล้วแต่ยังมีรายการยืมอ้างถึง
+        pass
+
+    @abstractmethod
+    def load_publications(self) -> Iterator[Publication]:
+        # คืนสิ่งพิมพ์ทั้งหมดเรียงตามตำแหน่งที่บันทึกไว้
+        pass
+
+    @abstractmethod
+    def load_loan_rows(self, member_id: Optional[str] = None, returned: Optional[bool] = None) -> Iterator[LoanRow]:
+        # คืนแถวข้อมูลการยืม กรองตามสมาชิกและสถานะการคืนได้
+        pass
+
+    @abstractmethod
+    def next_loan_id(self) -> int:
+        pass
+
+    @abstractmethod
+    def save_member(self, member: Member) -> None:
+        pass
+
+    @abstractmethod
+    def remove_member(self, member_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def save_publication(self, position: int, publication: Publication) -> None:
+        pass
+
+    @abstractmethod
+    def save_loan(self, loan: Loan, position: int) -> None:
+        pass
+
+    @abstractmethod
+    def mark_returned(self, loan_id: int) -> None:
+        pass
+
+    @abstractmethod
+    def load_reservations(self) -> Iterator[Tuple[int, str]]:
+        # คืน (ตำแหน่งสิ่งพิมพ์, member_id) ของการจองทั้งหมดตามลำดับที่จอง
+        pass
+
+    @abstractmethod
+    def save_reservation(self, position: int, member_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def remove_reservation(self, position: int, member_id: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        # เขียนข้อมูลที่ค้างอยู่ลงที่เก็บ (storage ที่ไม่ได้ทำ batch ไม่ต้อง override)
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+# Class SQLiteStorage - เก็บข้อมูลใน SQLite โดยรวมการเขียนเป็น batch ใน transaction เดียว
+
+class SQLiteStorage(LibraryStorage):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS members (
+            member_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            contact_info TEXT NOT NULL,
+            update_history TEXT NOT NULL DEFAULT '[]',
+            removed INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS publications (
+            position INTEGER PRIMARY KEY,
+            type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            isbn TEXT,
+            genre TEXT,
+            copies INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE IF NOT EXISTS loans (
+            loan_id INTEGER PRIMARY KEY,
+            member_id TEXT NOT NULL,
+            position INTEGER NOT NULL REFERENCES publications(position),
+            loan_date TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            returned INTEGER NOT NULL DEFAULT 0,
+            copy_number INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE IF NOT EXISTS reservations (
+            reservation_id INTEGER PRIMARY KEY,
+            position INTEGER NOT NULL REFERENCES publications(position),
+            member_id TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_publications_isbn ON publications(isbn);
+        CREATE INDEX IF NOT EXISTS idx_publications_title ON publications(title);
+        CREATE INDEX IF NOT EXISTS idx_loans_member ON loans(member_id, returned);
+        CREATE INDEX IF NOT EXISTS idx_loans_due ON loans(returned, due_date);
+    """
+
+    def __init__(self, path: str, batch_size: int = 500):
+        # ใช้ connection เดียวตลอดอายุของ storage
+        self.batch_size = batch_size
+        # connection ใช้ร่วมกันได้หลาย thread โดยป้องกันด้วย self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+        # คำสั่งเขียนที่รอ flush: (sql, parameters)
+        self._pending: List[Tuple[str, tuple]] = []
+
+    def _migrate(self) -> None:
+        # เพิ่มคอลัมน์ที่ไม่มีในไฟล์ที่สร้างด้วยเวอร์ชันก่อน
+        for table, column in (("publications", "copies"), ("loans", "copy_number")):
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 1")
+        self._conn.commit()
+
+    def _write(self, sql: str, params: tuple) -> None:
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            # เขียนทั้งหมดใน transaction เดียว และรวมคำสั่งที่เหมือนกันติดกันเป็น executemany
+            with self._conn:
+                start = 0
+                while start < len(pending):
+                    sql = pending[start][0]
+                    end = start
+                    while end < len(pending) and pending[end][0] == sql:
+                        end += 1
+                    self._conn.executemany(sql, [params for _, params in pending[start:end]])
+                    start = end
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def _query(self, sql: str, params: tuple = ()) -> Iterator[tuple]:
+        # อ่านข้อมูลหลัง flush เพื่อให้เห็นการเขียนที่ยังค้างอยู่ด้วย
+        # และดึงทีละชุดโดยถือ lock เฉพาะตอนอ่านจาก cursor
+        with self._lock:
+            self.flush()
+            cursor = self._conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            yield from rows
+
+    def load_members(self) -> Iterator[Tuple[Member, bool]]:
+        for member_id, name, contact_info, update_history, removed in self._query(
+                "SELECT member_id, name, contact_info, update_history, removed FROM members"):
+            member = Member(member_id, name, contact_info)
+            member.update_history = json.loads(update_history)
+            yield member, bool(removed)
+
+    def load_publications(self) -> Iterator[Publication]:
+        for _, pub_type, title, author, year, isbn, genre, copies in self._query(
+                "SELECT position, type, title, author, year, isbn, genre, copies FROM publications ORDER BY position"):
+            if pub_type != "Book":
+                raise ValueError(f"Unknown publication type: {pub_type}")
+            yield Book(title, author, year, isbn, genre, copies)
+
+    def load_loan_rows(self, member_id: Optional[str] = None, returned: Optional[bool] = None) -> Iterator[LoanRow]:
+        conditions, params = [], []
+        if member_id is not None:
+            conditions.append("member_id = ?")
+            params.append(member_id)
+        if returned is not None:
+            conditions.append("returned = ?")
+            params.append(int(returned))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        for row in self._query(
+                f"SELECT loan_id, member_id, position, loan_date, due_date, returned, copy_number "
+                f"FROM loans{where} ORDER BY loan_id", tuple(params)):
+            yield row[:5] + (bool(row[5]), row[6])
+
+    def next_loan_id(self) -> int:
+        return next(self._query("SELECT COALESCE(MAX(loan_id), -1) + 1 FROM loans"))[0]
+
+    def save_member(self, member: Member) -> None:
+        self._write(
+            "INSERT INTO members (member_id, name, contact_info, update_history, removed) VALUES (?, ?, ?, ?, 0) "
+            "ON CONFLICT(member_id) DO UPDATE SET name = excluded.name, contact_info = excluded.contact_info, "
+            "update_history = excluded.update_history, removed = 0",
+            (member.member_id, member.name, member.contact_info, json.dumps(member.update_history)))
+
+    def remove_member(self, member_id: str) -> None:
+        # ลบแบบ soft delete เพราะรายการยืมเก่ายังต้องอ้างถึงสมาชิกคนนี้
+        self._write("UPDATE members SET removed = 1 WHERE member_id = ?", (member_id,))
+
+    def save_publication(self, position: int, publication: Publication) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO publications (position, type, title, author, year, isbn, genre, copies) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (position, publication.get_type(), publication.title, publication.author, publication.year,
+             getattr(publication, "ISBN", None), getattr(publication, "genre", None), publication.copies))
+
+    def save_loan(self, loan: Loan, position: int) -> None:
+        self._write(
+            "INSERT INTO loans (loan_id, member_id, position, loan_date, due_date, returned, copy_number) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (loan.loan_id, loan.member.member_id, position, loan.loan_date, loan.due_date, int(loan.returned),
+             loan.copy_number))
+
+    def mark_returned(self, loan_id: int) -> None:
+        self._write("UPDATE loans SET returned = 1 WHERE loan_id = ?", (loan_id,))
+
+    def load_reservations(self) -> Iterator[Tuple[int, str]]:
+        return self._query("SELECT position, member_id FROM reservations ORDER BY reservation_id")
+
+    def save_reservation(self, position: int, member_id: str) -> None:
+        self._write("INSERT INTO reservations (position, member_id) VALUES (?, ?)", (position, member_id))
+
+    def remove_reservation(self, position: int, member_id: str) -> None:
+        self._write("DELETE FROM reservations WHERE position = ? AND member_id = ?", (position, member_id))
+
+
+# Class JournalStorage - บันทึกทุกการเปลี่ยนแปลงเป็น event ต่อท้ายไฟล์ (append-only) พร้อม snapshot เป็นระยะ
+
+class JournalStorage(LibraryStorage):
+    JOURNAL_FILE = "journal.jsonl"
+    SNAPSHOT_FILE = "snapshot.json"
+
+    def __init__(self, directory: str, batch_size: int = 500, snapshot_every: int = 10000):
+        # journal ไม่ถูกลบหรือแก้ไข จึงใช้เป็น audit trail ได้
+        # snapshot เก็บสถานะทั้งหมด ณ ตำแหน่งหนึ่งใน journal ตอนเริ่มต้นจึง replay เฉพาะ event หลังจากนั้น
+        os.makedirs(directory, exist_ok=True)
+        self.journal_path = os.path.join(directory, self.JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+        self.batch_size = batch_size
+        self.snapshot_every = snapshot_every
+        self._lock = threading.RLock()
+        # ใช้ระหว่างเขียนไฟล์ snapshot (นอก self._lock) เพื่อไม่ให้เขียนไฟล์ชั่วคราวพร้อมกัน
+        self._snapshot_lock = threading.Lock()
+        # สถานะปัจจุบันในรูปแบบกระชับ
+        # members: member_id -> [name, contact_info, update_history, removed]
+        # publications: [type, title, author, year, isbn, genre, copies] เรียงตามตำแหน่ง
+        # loans: loan_id -> [member_id, position, loan_date, due_date, returned, copy_number]
+        # reservations: [position, member_id] ตามลำดับที่จอง
+        self._members: Dict[str, list] = {}
+        self._publications: List[list] = []
+        self._loans: Dict[int, list] = {}
+        # member_id -> loan_id ของสมาชิกคนนั้นตามลำดับการยืม (ดูประวัติได้โดยไม่ต้องไล่ทุกรายการยืม)
+        self._loans_by_member: Dict[str, List[int]] = {}
+        self._reservations: List[list] = []
+        self._seq = 0
+        self._events_since_snapshot = 0
+        self.replayed_events = 0  # จำนวน event ที่ replay ตอนเริ่มต้น
+        self._pending: List[str] = []
+        self._recover()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _recover(self) -> None:
+        offset = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._seq = snapshot["seq"]
+            offset = snapshot["journal_offset"]
+            self._members = {m[0]: m[1:] for m in snapshot["members"]}
+            self._publications = snapshot["publications"]
+            self._loans = {l[0]: l[1:] for l in snapshot["loans"]}
+            for loan_id, record in self._loans.items():
+                self._loans_by_member.setdefault(record[0], []).append(loan_id)
+            self._reservations = snapshot["reservations"]
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as f:
+            f.seek(offset)
+            good_offset = offset
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # บรรทัดสุดท้ายที่เขียนไม่ครบ (เช่น โปรแกรมปิดกะทันหัน) ถูกตัดทิ้ง
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(event)
+                self._seq = event["seq"]
+                self.replayed_events += 1
+                good_offset += len(line)
+        with open(self.journal_path, "r+b") as f:
+            f.truncate(good_offset)
+        self._events_since_snapshot = self.replayed_events
+
+    def _apply(self, event: dict) -> None:
+        kind = event["type"]
+        if kind == "member_saved":
+            record = self._members.get(event["member_id"])
+            history = (record[2] if record else []) + event["history"]
+            self._members[event["member_id"]] = [event["name"], event["contact_info"], history, False]
+        elif kind == "member_removed":
+            if event["member_id"] in self._members:
+                self._members[event["member_id"]][3] = True
+        elif kind == "publication_added":
+            record = [event["pub_type"], event["title"], event["author"], event["year"], event["isbn"], event["genre"],
+                      event["copies"]]
+            if event["position"] < len(self._publications):
+                self._publications[event["position"]] = record
+            else:
+                self._publications.append(record)
+        elif kind == "loan_created":
+            if event["loan_id"] not in self._loans:
+                self._loans_by_member.setdefault(event["member_id"], []).append(event["loan_id"])
+            self._loans[event["loan_id"]] = [event["member_id"], event["position"], event["loan_date"],
+                                             event["due_date"], event["returned"], event["copy_number"]]
+        elif kind == "loan_returned":
+            self._loans[event["loan_id"]][4] = True
+        elif kind == "reservation_added":
+            self._reservations.append([event["position"], event["member_id"]])
+        elif kind == "reservation_removed":
+            self._reservations.remove([event["position"], event["member_id"]])
+        else:
+            raise ValueError(f"Unknown journal event: {kind}")
+
+    def _record(self, kind: str, **data) -> None:
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "ts": datetime.now().isoformat(timespec="seconds"), "type": kind, **data}
+            self._apply(event)
+            self._pending.append(json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+            self._events_since_snapshot += 1
+            # _record ถูกเรียกระหว่างที่ Library ถือ lock อยู่ จึงเขียนแค่ journal ไม่ทำ snapshot ที่นี่
+            # snapshot จะทำตอน flush() ที่เรียกจากภายนอก (autosave, จบการนำเข้า, ปิดโปรแกรม)
+            if len(self._pending) >= self.batch_size:
+                self._write_pending()
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._journal.write("\n".join(self._pending) + "\n")
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+                self._pending = []
+
+    def flush(self) -> None:
+        self._write_pending()
+        if self._events_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self) -> None:
+        # คัดลอกสถานะภายใต้ lock แล้วเขียนไฟล์นอก lock เพื่อไม่ให้การบันทึกอื่นต้องรอ
+        # เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ เพื่อไม่ให้ได้ snapshot ที่เขียนไม่ครบ
+        with self._snapshot_lock:
+            with self._lock:
+                self._write_pending()
+                snapshot = {
+                    "seq": self._seq,
+                    "journal_offset": self._journal.tell(),
+                    "members": [[member_id] + record for member_id, record in self._members.items()],
+                    "publications": list(self._publications),
+                    "loans": [[loan_id] + record for loan_id, record in self._loans.items()],
+                    "reservations": list(self._reservations),
+                }
+                self._events_since_snapshot = 0
+            temp_path = self.snapshot_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_path)
+
+    def close(self) -> None:
+        # flush นอก self._lock เพราะ snapshot ถือ _snapshot_lock ก่อน self._lock
+        self.flush()
+        with self._lock:
+            self._write_pending()
+            self._journal.close()
+
+    def load_members(self) -> Iterator[Tuple[Member, bool]]:
+        with self._lock:
+            records = list(self._members.items())
+        for member_id, (name, contact_info, update_history, removed) in records:
+            member = Member(member_id, name, contact_info)
+            member.update_history = list(update_history)
+            yield member, removed
+
+    def load_publications(self) -> Iterator[Publication]:
+        with self._lock:
+            records = list(self._publications)
+        for pub_type, title, author, year, isbn, genre, copies in records:
+            if pub_type != "Book":
+                raise ValueError(f"Unknown publication type: {pub_type}")
+            yield Book(title, author, year, isbn, genre, copies)
+
+    def load_loan_rows(self, member_id: Optional[str] = None, returned: Optional[bool] = None) -> Iterator[LoanRow]:
+        # loan_id ถูกสร้างเรียงกัน dict และ index ของสมาชิกจึงเรียงตาม loan_id อยู่แล้ว
+        with self._lock:
+            if member_id is None:
+                records = self._loans.items()
+            else:
+                records = ((loan_id, self._loans[loan_id]) for loan_id in self._loans_by_member.get(member_id, ()))
+            rows = [(loan_id, *record) for loan_id, record in records if returned is None or record[4] == returned]
+        return iter(rows)
+
+    def next_loan_id(self) -> int:
+        with self._lock:
+            return max(self._loans, default=-1) + 1
+
+    def save_member(self, member: Member) -> None:
+        # บันทึกเฉพาะรายการประวัติใหม่ที่ยังไม่อยู่ใน journal
+        with self._lock:
+            record = self._members.get(member.member_id)
+            known = len(record[2]) if record else 0
+            self._record("member_saved", member_id=member.member_id, name=member.name,
+                         contact_info=member.contact_info, history=member.update_history[known:])
+
+    def remove_member(self, member_id: str) -> None:
+        self._record("member_removed", member_id=member_id)
+
+    def save_publication(self, position: int, publication: Publication) -> None:
+        self._record("publication_added", position=position, pub_type=publication.get_type(),
+                     title=publication.title, author=publication.author, year=publication.year,
+                     isbn=getattr(publication, "ISBN", None), genre=getattr(publication, "genre", None),
+                     copies=publication.copies)
+
+    def save_loan(self, loan: Loan, position: int) -> None:
+        self._record("loan_created", loan_id=loan.loan_id, member_id=loan.member.member_id, position=position,
+                     loan_date=loan.loan_date, due_date=loan.due_date, returned=loan.returned,
+                     copy_number=loan.copy_number)
+
+    def mark_returned(self, loan_id: int) -> None:
+        self._record("loan_returned", loan_id=loan_id)
+
+    def load_reservations(self) -> Iterator[Tuple[int, str]]:
+        with self._lock:
+            return iter([tuple(record) for record in self._reservations])
+
+    def save_reservation(self, position: int, member_id: str) -> None:
+        self._record("reservation_added", position=position, member_id=member_id)
+
+    def remove_reservation(self, position: int, member_id: str) -> None:
+        self._record("reservation_removed", position=position, member_id=member_id)
@@ -0,0 +1,127 @@
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Background Tasks - รันงานนอก main thread ของ GUI แล้วส่งผลกลับผ่าน callback
+
+class BackgroundTask:
+    # งานหนึ่งชิ้นที่รันใน thread pool: work(task) สามารถตรวจ task.cancelled เพื่อหยุดทำงานก่อนเสร็จได้
+    def __init__(self, work: Callable[["BackgroundTask"], Any], on_done: Callable[[Any], None],
+                 on_error: Optional[Callable[[Exception], None]], channel: Optional[str]):
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.channel = channel
+        self.future: Optional[Future] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        # ยกเลิกงานที่ยังไม่เริ่ม และทิ้งผลลัพธ์ของงานที่กำลังรันอยู่
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class BackgroundTasks:
+    # รันงานของ Library นอก Tk main loop แล้วส่งผลกลับมาเรียก callback ใน main thread
+    # โดย poll ผ่าน schedule (เช่น root.after) เพราะ tkinter ไม่รองรับการเรียกจาก thread อื่น
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, schedule: Callable[[int, Callable[[], None]], Any], max_workers: int = 2,
+                 on_change: Optional[Callable[[List[BackgroundTask]], None]] = None):
+        self._schedule = schedule
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        # on_change(running_tasks) ถูกเรียกใน main thread เมื่อรายการงานที่รันอยู่เปลี่ยน (ใช้แสดง progress)
+        self._on_change = on_change
+        self._running: List[BackgroundTask] = []
+        self._channels: Dict[str, BackgroundTask] = {}
+        # callbacks จาก thread อื่นที่รอเรียกใน main thread
+        self._main_calls: "queue.Queue[Callable[[], None]]" = queue.Queue()
+        self._main_thread = threading.current_thread()
+        self._polling = False
+
+    @property
+    def running(self) -> List[BackgroundTask]:
+        return list(self._running)
+
+    def submit(self, work: Callable[[BackgroundTask], Any], on_done: Callable[[Any], None],
+               on_error: Optional[Callable[[Exception], None]] = None,
+               channel: Optional[str] = None) -> BackgroundTask:
+        # งานใหม่ใน channel เดียวกันจะแทนที่งานเก่า (เช่น การค้นหาครั้งล่าสุดเท่านั้นที่แสดงผล)
+        task = BackgroundTask(work, on_done, on_error, channel)
+        if channel is not None:
+            previous = self._channels.get(channel)
+            if previous is not None:
+                previous.cancel()
+            self._channels[channel] = task
+        task.future = self._executor.submit(self._run, task)
+        self._running.append(task)
+        self._changed()
+        self._start_polling()
+        return task
+
+    def _run(self, task: BackgroundTask) -> Any:
+        if task.cancelled:
+            return None
+        return task.work(task)
+
+    def call_in_main(self, callback: Callable[[], None]) -> None:
+        # เรียก callback ใน main thread (ถ้าถูกเรียกจาก worker จะรอจนถึงรอบ poll ถัดไป)
+        if threading.current_thread() is self._main_thread:
+            callback()
+        else:
+            self._main_calls.put(callback)
+
+    def cancel_all(self) -> None:
+        for task in self._running:
+            task.cancel()
+
+    def shutdown(self) -> None:
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start_polling(self) -> None:
+        if not self._polling:
+            self._polling = True
+            self._schedule(self.POLL_INTERVAL_MS, self.poll)
+
+    def poll(self) -> None:
+        self._polling = False
+        # ตรวจงานที่เสร็จก่อน แล้วจึงเรียก callbacks ที่ค้างอยู่ เพื่อไม่ให้พลาด callback ที่ถูกส่งมาก่อนงานจบ
+        finished = [task for task in self._running if task.future.done()]
+        while True:
+            try:
+                callback = self._main_calls.get_nowait()
+            except queue.Empty:
+                break
+            callback()
+        for task in finished:
+            self._running.remove(task)
+            if task.channel is not None and self._channels.get(task.channel) is task:
+                del self._channels[task.channel]
+            self._deliver(task)
+        if finished:
+            self._changed()
+        if self._running:
+            self._start_polling()
+
+    def _deliver(self, task: BackgroundTask) -> None:
+        if task.cancelled:
+            return
+        error = task.future.exception()
+        if error is None:
+            task.on_done(task.future.result())
+        elif task.on_error is not None:
+            task.on_error(error)
+        else:
+            raise error
+
+    def _changed(self) -> None:
+        if self._on_change is not None:
+            self._on_change(self.running)
@@ -0,0 +1,647 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from datetime import date
+
+from library_system import (AlreadyLoanedError, AlreadyReservedError, Book, JournalStorage, Library,
+                            Loan, Member, MemberNotFoundError, NoActiveLoanError, NoReservationError,
+                            PublicationNotFoundError, ReservedForAnotherMemberError, SQLiteStorage, export_records,
+                            import_records, instrumentation)
+from library_system.analytics import compute_loan_statistics, export_loan_columns
+from library_system.benchmark import benchmark_library, generate_library
+from library_system.cli import STARTUP_BUDGET_S, main, measure_startup
+from library_system.tasks import BackgroundTasks
+
+
+# Unit Tests - การทดสอบการทำงาน (รันด้วย `python -m library_system test` หรือ pytest)
+
+class LibraryTests(unittest.TestCase):
+    def setUp(self):
+        # เตรียมข้อมูลสำหรับการทดสอบ
+        self.library = Library()
+        self.member = Member("M001", "Test User", "test@email.com")
+        self.book = Book("Test Book", "Test Author", 2024, "1234567890", "Test Genre")
+    
+    def test_add_member(self):
+        # ทดสอบการเพิ่มสมาชิก
+        self.library.add_member(self.member)
+        self.assertEqual(len(self.library.members), 1)
+        self.assertEqual(self.library.members[0].name, "Test User")
+    
+    def test_add_publication(self):
+        self.library.add_publication(self.book)
+        self.assertEqual(len(self.library.publications), 1)
+        self.assertEqual(self.library.publications[0].title, "Test Book")
+    
+    def test_borrow_publication(self):
+        self.library.add_member(self.member)
+        self.library.add_publication(self.book)
+        self.library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+        self.assertEqual(len(self.library.loans), 1)
+        self.assertFalse(self.library.loans[0].returned)
+
+    def test_find_by_index(self):
+        self.library.add_member(self.member)
+        self.library.add_publication(self.book)
+        self.assertIs(self.library.find_member("M001"), self.member)
+        self.assertIs(self.library.find_publication_by_title("Test Book"), self.book)
+        self.assertIs(self.library.find_publication_by_isbn("1234567890"), self.book)
+        self.library.remove_member("M001")
+        self.assertIsNone(self.library.find_member("M001"))
+        self.assertEqual(len(self.library.members), 0)
+        # ลบสมาชิกตรงกลางแล้ว index ตำแหน่งของสมาชิกที่ถูกย้ายยังถูกต้อง
+        self.library.add_members(Member(f"M{i}", f"User {i}", "") for i in range(5))
+        self.library.remove_member("M1")
+        self.library.remove_member("M4")
+        self.library.remove_member("M0")
+        self.assertEqual(sorted(m.member_id for m in self.library.members), ["M2", "M3"])
+        self.library.remove_member("M3")
+        self.assertEqual([m.member_id for m in self.library.members], ["M2"])
+
+    def test_find_publications(self):
+        self.library.add_publication(self.book)
+        other = Book("Python Cookbook", "David Beazley", 2013, "9781449340377", "Programming")
+        self.library.add_publication(other)
+        self.assertEqual(self.library.find_publications("test bo"), [self.book])
+        self.assertEqual(self.library.find_publications("BEAZ", "author"), [other])
+        self.assertEqual(self.library.find_publications("o", "title"), [self.book, other])
+        self.assertEqual(self.library.find_publications("", "genre"), [self.book, other])
+        self.assertEqual(self.library.find_publications("x", "isbn"), [])
+
+    def test_search_cache_refine_and_invalidate(self):
+        self.library.add_publication(self.book)
+        other = Book("Testing Python", "Someone", 2020, "111", "Programming")
+        self.library.add_publication(other)
+        self.assertEqual(self.library.find_publications("tes"), [self.book, other])
+        # คำค้นที่ยาวขึ้นถูกกรองจากผลเดิมใน cache
+        self.assertEqual(self.library.find_publications("testi"), [other])
+        self.assertIn(("testi", "title"), self.library._search_cache)
+        self.assertEqual(self.library.find_publications("TES"), [self.book, other])
+        self.assertEqual(self.library.count_publications("tes"), 2)
+        self.assertEqual(self.library.find_publications("tes", offset=1, limit=5), [other])
+        # การเพิ่มสิ่งพิมพ์ทำให้ cache ถูกล้าง
+        third = Book("Test Driven", "Kent Beck", 2002, "222", "Programming")
+        self.library.add_publication(third)
+        self.assertEqual(self.library.find_publications("tes"), [self.book, other, third])
+
+    def test_search_repeated_character_terms(self):
+        agent = Book("Agent 000", "Someone", 2020, "111", "Spy")
+        sleepy = Book("Zzz", "Someone", 2020, "222", "Humor")
+        self.library.add_publication(agent)
+        self.library.add_publication(sleepy)
+        # คำที่มี trigram เดียวแต่ยาวกว่า 3 ตัวอักษรต้องตรวจ substring จริง
+        self.assertEqual(self.library.find_publications("0000"), [])
+        self.assertEqual(self.library.find_publications("zzzzz"), [])
+        self.assertEqual(self.library.query_publications(["0000"]), [])
+        self.assertEqual(self.library.find_publications("000"), [agent])
+        self.assertEqual(self.library.find_publications("zzz"), [sleepy])
+
+    def test_query_publications(self):
+        self.library.add_publication(self.book)
+        exact = Book("Book", "Someone", 2020, "111", "Test Genre")
+        self.library.add_publication(exact)
+        self.assertEqual(self.library.query_publications(["test", "book"], operator="and"), [self.book])
+        self.assertEqual(self.library.query_publications(["book"], operator="or"), [exact, self.book])
+        self.assertEqual(self.library.query_publications(["book", "test"], operator="or", limit=1), [self.book])
+        with self.assertRaises(ValueError):
+            self.library.query_publications(["book"], operator="xor")
+
+    def test_overdue_and_due_soon(self):
+        self.library.add_member(self.member)
+        self.library.add_publication(self.book)
+        other = Book("Other Book", "Test Author", 2024, "0987654321", "Test Genre")
+        self.library.add_publication(other)
+        self.library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+        self.library.borrow_publication("M001", "Other Book", "2024-03-30", "2024-04-20")
+        as_of = date(2024, 4, 14)
+        self.assertEqual([l.publication for l in self.library.get_overdue_loans(as_of)], [self.book])
+        self.assertEqual([l.publication for l in self.library.get_loans_due_within(7, as_of)], [other])
+        self.library.return_publication("Test Book")
+        self.assertEqual(self.library.get_overdue_loans(as_of), [])
+
+    def test_paged_loan_queries(self):
+        self.library.add_member(self.member)
+        self.library.add_publications(Book(f"Book {i}", "Author", 2024, str(i), "Genre") for i in range(5))
+        for i in range(5):
+            self.library.borrow_publication("M001", f"Book {i}", "2024-03-01", f"2024-03-1{i}")
+        as_of = date(2024, 3, 14)
+        self.assertEqual(self.library.count_overdue_loans(as_of), 4)
+        self.assertEqual([l.publication.title for l in self.library.get_overdue_loans(as_of, 1, 2)],
+                         ["Book 1", "Book 2"])
+        self.assertEqual(self.library.count_active_loans(), 5)
+        self.assertEqual([l.publication.title for l in self.library.get_active_loans(3)], ["Book 3", "Book 4"])
+        self.assertEqual(self.library.get_active_loans(10, 5), [])
+
+    def test_loan_statistics_and_report_lines(self):
+        self.library.add_member(self.member)
+        self.library.add_publication(self.book)
+        self.library.add_publication(Book("Other Book", "Other Author", 2024, "0987654321", "Other Genre"))
+        self.library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+        self.library.return_publication("Test Book")
+        self.library.borrow_publication("M001", "Test Book", "2024-04-14", "2024-04-28")
+        self.library.borrow_publication("M001", "Other Book", "2024-04-14", "2024-04-28")
+        stats = self.library.get_loan_statistics(date(2024, 4, 29))
+        self.assertEqual((stats["active"], stats["overdue"]), (2, 2))
+        self.assertEqual(self.library.count_member_active_loans("M001"), 2)
+        self.assertEqual(stats["by_genre"], {"Test Genre": 1, "Other Genre": 1})
+        self.assertEqual(stats["most_borrowed"], [("Test Book", 2), ("Other Book", 1)])
+        self.library.return_publication("Other Book")
+        self.assertEqual(self.library.active_loans_by_author(), {"Test Author": 1})
+
+        self.assertIn("loaned to Test User", self.library.generate_loan_report())
+        self.library.update_member("M001", "Renamed User", "test@email.com")
+        self.assertIn("loaned to Renamed User", self.library.generate_loan_report())
+
+    def test_batch_borrow_and_return(self):
+        self.library.add_member(self.member)
+        self.library.add_publication(self.book)
+        self.library.add_publication(Book("Other Book", "Test Author", 2024, "0987654321", "Test Genre"))
+        events = []
+        self.library.subscribe(events.append)
+
+        result = self.library.borrow_publications("M001", ["Test Book", "0987654321", "Missing"],
+                                                  "2024-03-30", "2024-04-13")
+        self.assertEqual(result.loans, [])
+        self.assertEqual(result.errors, [("Missing", "Publication not found!")])
+        self.assertEqual(self.library.count_active_loans(), 0)
+
+        result = self.library.borrow_publications("M001", ["Test Book", "0987654321"], "2024-03-30", "2024-04-13")
+        self.assertTrue(result.ok)
+        self.assertEqual(self.library.count_member_active_loans("M001"), 2)
+        self.assertEqual([e.kind for e in events], ["publications_borrowed"])
+        with self.assertRaises(MemberNotFoundError):
+            self.library.borrow_publications("M999", ["Test Book"], "2024-03-30", "2024-04-13")
+
+        # คืนแบบแยกสถานะรายการ: รายการที่คืนได้จะถูกคืนแม้มีรายการผิดพลาด
+        result = self.library.return_publications(["1234567890", "Other Book", "Other Book"])
+        self.assertEqual([loan.publication.title for loan in result.loans], ["Test Book", "Other Book"])
+        self.assertEqual(len(result.errors), 1)
+        self.assertEqual(self.library.count_active_loans(), 0)
+        self.assertEqual(self.library.get_overdue_loans(date(2024, 5, 1)), [])
+
+    def test_synthetic_library_and_benchmark(self):
+        library = generate_library(300, seed=7)
+        again = generate_library(300, seed=7)
+        self.assertEqual([p.title for p in library.publications], [p.title for p in again.publications])
+        self.assertEqual(len(library.members), 300)
+        self.assertEqual(len(library.loans), 300)
+        self.assertEqual(library.count_active_loans(), 15)
+        results = benchmark_library(300, calls=50)
+        self.assertEqual([r["operation"] for r in results][:4], ["find_member", "find_publications[title]",
+                                                                 "find_publications[author]", "find_publications[genre]"])
+        self.assertTrue(all(r["calls"] > 0 for r in results))
+        json.dumps(results)
+        # calls น้อยกว่า 10 ก็ยังวัด operation ที่ช้าได้อย่างน้อยครั้งละ 1
+        small = {r["operation"]: r["calls"] for r in benchmark_library(200, calls=5)}
+        self.assertEqual(small["get_member_history"], 1)
+
+    def test_instrumentation_toggle_and_dump(self):
+        original = Library.find_member
+        self.library.add_member(self.member)
+        instrumentation.reset()
+        instrumentation.enable()
+        try:
+            for _ in range(10):
+                self.library.find_member("M001")
+            self.library.find_publications("test")
+            self.library.generate_loan_report()
+            self.library.get_member_history("M001")
+            for _ in range(5):
+                with self.assertRaises(NoActiveLoanError):
+                    self.library.return_publication("Missing")
+        finally:
+            instrumentation.disable()
+        self.library.find_member("M001")  # ไม่ถูกนับหลังปิด
+        self.assertIs(Library.find_member, original)
+        stats = {row["method"]: row for row in instrumentation.snapshot()}
+        self.assertEqual(stats["Library.find_member"]["calls"], 11)  # รวมครั้งที่ get_member_history เรียก
+        self.assertEqual(stats["Library.find_member"]["errors"], 0)
+        self.assertEqual((stats["Library.return_publication"]["calls"], stats["Library.return_publication"]["errors"]),
+                         (5, 5))
+        self.assertEqual(stats["Library.find_publications"]["mean_result_size"], 0)
+        # รายงาน (string) และประวัติ (dict) ไม่มีขนาดผลลัพธ์
+        self.assertIsNone(stats["Library.generate_loan_report"]["mean_result_size"])
+        self.assertIsNone(stats["Library.get_member_history"]["mean_result_size"])
+        self.assertLessEqual(stats["Library.find_member"]["p50_us"], stats["Library.find_member"]["p99_us"])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "diagnostics.json")
+            instrumentation.dump(path)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(len(json.load(f)["methods"]), len(stats))
+        instrumentation.reset()
+
+    def test_multi_copy_holdings_and_reservations(self):
+        self.library.add_member(self.member)
+        self.library.add_member(Member("M002", "Second User", "second@email.com"))
+        self.library.add_member(Member("M003", "Third User", "third@email.com"))
+        self.library.add_publication(Book("Popular", "Author", 2024, "111", "Genre", copies=2))
+        first = self.library.borrow_publication("M001", "Popular", "2024-03-01", "2024-03-15")
+        second = self.library.borrow_publication("M002", "Popular", "2024-03-01", "2024-03-15")
+        self.assertEqual((first.barcode, second.barcode), ("111#1", "111#2"))
+        self.assertEqual(self.library.count_available("Popular"), 0)
+        with self.assertRaises(AlreadyLoanedError):
+            self.library.borrow_publication("M003", "Popular", "2024-03-01", "2024-03-15")
+        with self.assertRaises(ValueError):
+            self.library.add_publication(Book("No Copies", "Author", 2024, "112", "Genre", copies=0))
+        self.assertIsNone(self.library.find_publication_by_isbn("112"))
+
+        # คิวจอง FIFO: เล่มที่คืนถูกกันไว้ให้คนแรกในคิว
+        self.assertEqual(self.library.reserve_publication("M003", "Popular"), 1)
+        self.assertEqual(self.library.reserve_publication("M001", "Popular"), 2)
+        with self.assertRaises(AlreadyReservedError):
+            self.library.reserve_publication("M003", "Popular")
+        events = []
+        self.library.subscribe(events.append)
+        self.assertIs(self.library.return_publication("111#2"), second)
+        self.assertEqual(events[-1].kind, "reservation_available")
+        self.assertEqual(self.library.next_in_line("Popular").member_id, "M003")
+        with self.assertRaises(ReservedForAnotherMemberError):
+            self.library.borrow_publication("M002", "Popular", "2024-03-16", "2024-03-30")
+        loan = self.library.borrow_publication("M003", "Popular", "2024-03-16", "2024-03-30")
+        self.assertEqual(loan.copy_number, 2)
+        self.assertEqual(self.library.next_in_line("Popular").member_id, "M001")
+        self.library.cancel_reservation("M001", "Popular")
+        self.assertIsNone(self.library.next_in_line("Popular"))
+        with self.assertRaises(NoReservationError):
+            self.library.cancel_reservation("M001", "Popular")
+
+        # คืนชื่อเดียวกันสองครั้งในชุดเดียวกัน = คืนสองเล่ม
+        result = self.library.return_publications(["Popular", "Popular"])
+        self.assertTrue(result.ok)
+        self.assertEqual(self.library.count_available("Popular"), 2)
+
+        # มีเล่มว่าง 2 เล่มและคิว [M003, M002]: คนที่สองในคิวก็ยืมได้ และทั้งสองคนได้รับแจ้ง
+        self.library.borrow_publication("M001", "Popular", "2024-04-01", "2024-04-15")
+        self.library.borrow_publication("M001", "Popular", "2024-04-01", "2024-04-15")
+        self.library.reserve_publication("M003", "Popular")
+        self.library.reserve_publication("M002", "Popular")
+        events.clear()
+        self.library.return_publications(["Popular", "Popular"])
+        self.assertEqual([event.subject.member_id for event in events if event.kind == "reservation_available"],
+                         ["M003", "M002"])
+        with self.assertRaises(ReservedForAnotherMemberError):
+            self.library.borrow_publication("M001", "Popular", "2024-04-16", "2024-04-30")
+        self.library.borrow_publication("M002", "Popular", "2024-04-16", "2024-04-30")
+        self.assertEqual(self.library.next_in_line("Popular").member_id, "M003")
+
+    def test_loan_analytics(self):
+        library = generate_library(400, seed=3)
+        as_of = date(2024, 1, 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(export_loan_columns(library, tmp, chunk_size=64), 400)
+            statistics = compute_loan_statistics(tmp, as_of, workers=1, chunk_size=150)
+            # ผลต้องเท่ากับการนับตรงๆ จากรายการยืมในหน่วยความจำ
+            self.assertEqual(statistics.total, len(library.loans))
+            self.assertEqual(statistics.borrows_by_genre, dict(Counter(l.publication.genre for l in library.loans)))
+            self.assertEqual(statistics.borrows_by_author, dict(Counter(l.publication.author for l in library.loans)))
+            self.assertEqual(sum(statistics.borrows_by_month.values()), 400)
+            self.assertGreater(statistics.borrows_by_month[library.loans[0].loan_date[:7]], 0)
+            self.assertEqual(statistics.open, library.count_active_loans())
+            self.assertEqual(statistics.overdue, library.count_overdue_loans(as_of))
+            self.assertEqual(statistics.average_loan_days, 14)
+            # แบ่งไปหลาย process ได้ผลเหมือนกัน
+            parallel = compute_loan_statistics(tmp, as_of, workers=2, chunk_size=150)
+            self.assertEqual(parallel.rows(), statistics.rows())
+
+    def test_sqlite_storage_reload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "library.db")
+            library = Library(SQLiteStorage(path))
+            library.add_member(self.member)
+            library.add_publication(self.book)
+            library.update_member("M001", "Renamed User", "test@email.com")
+            library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+            library.return_publication("Test Book")
+            library.borrow_publication("M001", "Test Book", "2024-04-14", "2024-04-28")
+            library.reserve_publication("M001", "Test Book")
+            library.close()
+
+            reloaded = Library(SQLiteStorage(path))
+            self.assertEqual(reloaded.next_in_line("Test Book").member_id, "M001")
+            self.assertEqual(reloaded.find_member("M001").name, "Renamed User")
+            self.assertEqual(reloaded.most_borrowed_titles(), [("Test Book", 2)])
+            self.assertEqual(reloaded.get_active_loan("Test Book").barcode, "1234567890#1")
+            self.assertEqual(reloaded.find_publication_by_isbn("1234567890").title, "Test Book")
+            # โหลดเฉพาะรายการที่ยังไม่คืนตอนเริ่มต้น
+            self.assertEqual(len(reloaded.loans), 1)
+            history = reloaded.get_member_history("M001")
+            self.assertEqual(len(history["active_loans"]), 1)
+            self.assertEqual(len(history["returned_loans"]), 1)
+            self.assertEqual(len(history["update_history"]), 1)
+            reloaded.return_publication("Test Book")
+            reloaded.close()
+
+    def test_editions_sharing_a_title(self):
+        self.library.add_member(self.member)
+        self.library.add_member(Member("M002", "Second User", "second@email.com"))
+        first = Book("Dune", "Frank Herbert", 1965, "111", "Sci-Fi", copies=2)
+        second = Book("Dune", "Frank Herbert", 2005, "222", "Sci-Fi")
+        self.library.add_publication(first)
+        self.library.add_publication(second)
+        self.assertTrue(self.library.borrow_publications("M001", ["111"], "2024-03-01", "2024-03-15").ok)
+        # เล่มว่างและหมายเลขเล่มนับแยกตามฉบับพิมพ์ ไม่ใช่ตามชื่อ
+        result = self.library.borrow_publications("M002", ["222"], "2024-03-01", "2024-03-15")
+        self.assertTrue(result.ok)
+        self.assertIs(result.loans[0].publication, second)
+        self.assertEqual(result.loans[0].barcode, "222#1")
+        self.assertEqual((self.library.count_available("111"), self.library.count_available("222")), (1, 0))
+        result = self.library.borrow_publications("M001", ["222"], "2024-03-01", "2024-03-15")
+        self.assertEqual(result.errors, [("222", "Publication is already loaned!")])
+        # ชื่อเฉยๆ หมายถึงฉบับที่เพิ่มก่อน
+        self.assertEqual(self.library.borrow_publication("M001", "Dune", "2024-03-01", "2024-03-15").barcode, "111#2")
+        with self.assertRaises(AlreadyLoanedError):
+            self.library.borrow_publication("M002", "Dune", "2024-03-01", "2024-03-15")
+        self.assertEqual(self.library.reserve_publication("M001", "222"), 1)
+        self.assertEqual(self.library.count_reservations("111"), 0)
+        self.assertIs(self.library.return_publication("222#1").publication, second)
+        self.assertEqual(self.library.next_in_line("222").member_id, "M001")
+        self.assertEqual(self.library.count_available("111"), 0)
+
+    def test_borrow_counts_built_outside_state_lock(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            library = Library(SQLiteStorage(os.path.join(tmp, "library.db")), thread_safe=True)
+            library.add_member(self.member)
+            library.add_publication(self.book)
+            library.add_publication(Book("Other Book", "Author", 2024, "222", "Genre"))
+            library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+            library.return_publication("Test Book")
+            rows = library._storage.load_loan_rows
+
+            def load_loan_rows(*args, **kwargs):
+                # ยืมจาก thread อื่นระหว่างที่กำลังนับจาก storage: ต้องไม่ถูกบล็อกและต้องถูกนับด้วย
+                desk = threading.Thread(target=library.borrow_publication,
+                                        args=("M001", "Other Book", "2024-04-01", "2024-04-15"))
+                desk.start()
+                desk.join(5)
+                self.assertFalse(desk.is_alive())
+                return rows(*args, **kwargs)
+
+            library._storage.load_loan_rows = load_loan_rows
+            self.assertEqual(library.most_borrowed_titles(), [("Test Book", 1), ("Other Book", 1)])
+            library._storage.load_loan_rows = rows
+            library.close()
+
+    def test_journal_storage_snapshot_and_replay(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            library = Library(JournalStorage(tmp, snapshot_every=1000))
+            library.add_member(self.member)
+            library.add_publication(self.book)
+            library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+            library.return_publication("Test Book")
+            library._storage.snapshot()
+            library.update_member("M001", "Renamed User", "test@email.com")
+            library.borrow_publication("M001", "Test Book", "2024-04-14", "2024-04-28")
+            library.close()
+            # จำลองบรรทัดที่เขียนไม่ครบตอนโปรแกรมปิดกะทันหัน
+            with open(os.path.join(tmp, JournalStorage.JOURNAL_FILE), "a", encoding="utf-8") as f:
+                f.write('{"seq": 99, "type": "loan_ret')
+
+            storage = JournalStorage(tmp)
+            # replay เฉพาะ event หลัง snapshot (update_member และ borrow ครั้งที่สอง)
+            self.assertEqual(storage.replayed_events, 2)
+            # index รายการยืมของสมาชิกสร้างได้ทั้งจาก snapshot และจาก event ที่ replay
+            self.assertEqual([row[0] for row in storage.load_loan_rows("M001")], [0, 1])
+            self.assertEqual([row[0] for row in storage.load_loan_rows("M001", returned=False)], [1])
+            self.assertEqual(list(storage.load_loan_rows("M999")), [])
+            reloaded = Library(storage)
+            self.assertEqual(reloaded.find_member("M001").name, "Renamed User")
+            self.assertIsNotNone(reloaded.get_active_loan("Test Book"))
+            history = reloaded.get_member_history("M001")
+            self.assertEqual(len(history["returned_loans"]), 1)
+            self.assertEqual(len(history["update_history"]), 1)
+            reloaded.close()
+            with open(os.path.join(tmp, JournalStorage.JOURNAL_FILE), encoding="utf-8") as f:
+                events = [json.loads(line)["type"] for line in f]
+            self.assertEqual(events, ["member_saved", "publication_added", "loan_created", "loan_returned",
+                                      "member_saved", "loan_created"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # snapshot ไม่เกิดระหว่างบันทึก (ซึ่ง Library ถือ lock อยู่) แต่เกิดตอน flush จากภายนอก
+            library = Library(JournalStorage(tmp, batch_size=1, snapshot_every=2))
+            library.add_member(self.member)
+            library.add_publication(self.book)
+            library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+            snapshot_path = os.path.join(tmp, JournalStorage.SNAPSHOT_FILE)
+            self.assertFalse(os.path.exists(snapshot_path))
+            library.flush()
+            self.assertTrue(os.path.exists(snapshot_path))
+            library.close()
+            reopened = JournalStorage(tmp)
+            self.assertEqual(reopened.replayed_events, 0)
+            reopened.close()
+
+    def test_import_export_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            books = os.path.join(tmp, "books.csv")
+            with open(books, "w", newline="", encoding="utf-8") as f:
+                f.write("title,author,year,isbn,genre\n"
+                        "Book A,Author A,2001,111,Fiction\n"
+                        "Book B,Author B,not-a-year,222,Fiction\n"
+                        "Book C,Author C,2003,111,Poetry\n"
+                        "Book D,Author D,2004,444,Poetry\n")
+            report = import_records(self.library, books, "publications", chunk_size=2)
+            self.assertEqual(report.imported, 2)
+            self.assertEqual([line for line, _ in report.errors], [3, 4])
+            self.assertEqual(self.library.find_publication_by_isbn("444").title, "Book D")
+
+            exported = os.path.join(tmp, "export.csv")
+            self.assertEqual(export_records(self.library, exported, "publications"), 2)
+            copy = Library()
+            self.assertEqual(import_records(copy, exported, "publications").imported, 2)
+
+    def test_import_jsonl_loans(self):
+        self.library.add_member(self.member)
+        self.library.add_publication(self.book)
+        with tempfile.TemporaryDirectory() as tmp:
+            loans = os.path.join(tmp, "loans.jsonl")
+            with open(loans, "w", encoding="utf-8") as f:
+                f.write('{"member_id": "M001", "isbn": "1234567890", "loan_date": "2024-01-01", '
+                        '"due_date": "2024-01-15", "returned": true}\n'
+                        '{"member_id": "M001", "title": "Test Book", "loan_date": "2024-02-01", '
+                        '"due_date": "2024-02-15"}\n'
+                        '{"member_id": "M001", "title": "Test Book", "loan_date": "2024-03-01", '
+                        '"due_date": "2024-03-15"}\n'
+                        '{"member_id": "M999", "title": "Test Book"}\n'
+                        'not json\n')
+            report = import_records(self.library, loans, "loans")
+            self.assertEqual(report.imported, 2)
+            self.assertEqual([line for line, _ in report.errors], [3, 4, 5])
+            self.assertIsNotNone(self.library.get_active_loan("Test Book"))
+            self.assertEqual(export_records(self.library, os.path.join(tmp, "out.jsonl"), "loans"), 2)
+
+            # รายการที่ยังไม่คืนเกินจำนวนเล่มถูกปฏิเสธเหมือนกันไม่ว่าจะแบ่ง chunk อย่างไร
+            copies = os.path.join(tmp, "copies.jsonl")
+            with open(copies, "w", encoding="utf-8") as f:
+                for _ in range(3):
+                    f.write('{"member_id": "M001", "isbn": "555", "loan_date": "2024-02-01", '
+                            '"due_date": "2024-02-15"}\n')
+            for chunk_size in (1, 1000):
+                library = Library()
+                library.add_member(self.member)
+                library.add_publication(Book("Two Copies", "Author", 2024, "555", "Genre", copies=2))
+                report = import_records(library, copies, "loans", chunk_size=chunk_size)
+                self.assertEqual(report.imported, 2)
+                self.assertEqual([line for line, _ in report.errors], [3])
+
+    def test_errors_and_events(self):
+        events = []
+        self.library.subscribe(events.append)
+        self.library.add_member(self.member)
+        self.library.add_publication(self.book)
+        with self.assertRaises(MemberNotFoundError):
+            self.library.borrow_publication("M999", "Test Book", "2024-03-30", "2024-04-13")
+        with self.assertRaises(PublicationNotFoundError):
+            self.library.borrow_publication("M001", "No Such Book", "2024-03-30", "2024-04-13")
+        loan = self.library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+        with self.assertRaises(AlreadyLoanedError):
+            self.library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+        self.assertIs(self.library.return_publication("Test Book"), loan)
+        with self.assertRaises(NoActiveLoanError):
+            self.library.return_publication("Test Book")
+        with self.assertRaises(MemberNotFoundError):
+            self.library.update_member("M999", "Nobody", "")
+        self.assertEqual([e.kind for e in events],
+                         ["member_added", "publication_added", "publication_borrowed", "publication_returned"])
+        self.assertIs(events[2].subject, loan)
+
+    def test_slotted_records(self):
+        loan = Loan(self.member, self.book, "2024-03-30", "2024-04-13")
+        for record in (self.member, self.book, loan):
+            self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual((loan.loan_date, loan.due_date), ("2024-03-30", "2024-04-13"))
+        loan.due_date = "2024-04-20"
+        self.assertEqual(loan.due_ordinal, date(2024, 4, 20).toordinal())
+        self.assertIn("from 2024-03-30 to 2024-04-20 - Active", loan.display_loan())
+
+    def test_concurrent_borrow_stress(self):
+        library = Library(thread_safe=True)
+        titles = [f"Book {i}" for i in range(2000)]
+        library.add_members(Member(f"M{i}", f"User {i}", "") for i in range(8))
+        library.add_publications(Book(t, "Author", 2024, t, "Genre") for t in titles)
+        borrowed, returned = [], []
+        barrier = threading.Barrier(8)
+
+        def desk(member_id):
+            # ทุก desk พยายามยืมทุกเล่มพร้อมกัน แล้วพยายามคืนทุกเล่มพร้อมกัน
+            barrier.wait()
+            for title in titles:
+                try:
+                    borrowed.append(library.borrow_publication(member_id, title, "2024-03-30", "2024-04-13"))
+                except AlreadyLoanedError:
+                    pass
+            barrier.wait()
+            for title in titles:
+                try:
+                    returned.append(library.return_publication(title))
+                except NoActiveLoanError:
+                    pass
+
+        old_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # สลับ thread บ่อยๆ เพื่อให้เกิดการแย่งกันจริง
+        try:
+            threads = [threading.Thread(target=desk, args=(f"M{i}",)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.setswitchinterval(old_interval)
+
+        # แต่ละเล่มถูกยืมและคืนได้เพียงครั้งเดียว
+        self.assertEqual(len(borrowed), len(titles))
+        self.assertEqual(len(returned), len(titles))
+        self.assertEqual(len(library.loans), len(titles))
+        self.assertEqual(len({loan.loan_id for loan in library.loans}), len(titles))
+        self.assertEqual(library.get_overdue_loans(date(2100, 1, 1)), [])
+
+        # การค้นหาที่ใช้เวลานาน (ถือ search lock) ต้องไม่บล็อกการยืมจาก desk อื่น
+        with library._search_lock:
+            desk_thread = threading.Thread(target=library.borrow_publication,
+                                           args=("M0", "Book 0", "2024-04-14", "2024-04-28"))
+            desk_thread.start()
+            desk_thread.join(5)
+            self.assertFalse(desk_thread.is_alive())
+        self.assertEqual(library.count_publications("book 1"), 1111)
+
+    def test_background_tasks_supersede_and_cancel(self):
+        scheduled = []
+        tasks = BackgroundTasks(lambda delay, callback: scheduled.append(callback))
+        results, errors = [], []
+        release = threading.Event()
+
+        def slow_search(task):
+            release.wait(5)
+            return "old"
+
+        tasks.submit(slow_search, results.append, errors.append, channel="search")
+        tasks.submit(lambda task: "new", results.append, errors.append, channel="search")
+        failing = tasks.submit(lambda task: self.library.return_publication("Missing"), results.append, errors.append)
+        cancelled = tasks.submit(lambda task: "cancelled", results.append, errors.append)
+        cancelled.cancel()
+        release.set()
+        # จำลอง Tk main loop: เรียก callback ที่ถูก schedule ไว้จนกว่างานทั้งหมดจะเสร็จ
+        deadline = time.monotonic() + 5
+        while scheduled and time.monotonic() < deadline:
+            time.sleep(0.01)
+            scheduled.pop(0)()
+        tasks.shutdown()
+        self.assertEqual(results, ["new"])
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], NoActiveLoanError)
+        self.assertTrue(failing.future.done())
+
+    def test_return_and_reborrow(self):
+        self.library.add_member(self.member)
+        self.library.add_publication(self.book)
+        self.library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+        with self.assertRaises(AlreadyLoanedError):
+            self.library.borrow_publication("M001", "Test Book", "2024-03-30", "2024-04-13")
+        self.assertEqual(len(self.library.loans), 1)
+        self.library.return_publication("Test Book")
+        self.assertTrue(self.library.loans[0].returned)
+        self.library.borrow_publication("M001", "Test Book", "2024-04-14", "2024-04-28")
+        history = self.library.get_member_history("M001")
+        self.assertEqual(len(history["active_loans"]), 1)
+        self.assertEqual(len(history["returned_loans"]), 1)
+
+    def test_headless_cli(self):
+        # import CLI ใน process ใหม่ต้องไม่โหลด tkinter/unittest และต้องเร็วพอสำหรับ cron/script
+        startup = measure_startup(repeat=3)
+        self.assertEqual(startup["heavy_modules"], [])
+        self.assertLessEqual(startup["seconds"], STARTUP_BUDGET_S)
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, "library.db")
+            members = os.path.join(tmp, "members.jsonl")
+            loans = os.path.join(tmp, "loans.csv")
+            with open(members, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"member_id": "M001", "name": "John Doe", "contact_info": "john@example.com"}) + "\n")
+            with open(loans, "w", encoding="utf-8") as f:
+                f.write("member_id,isbn,title,loan_date,due_date,returned\nM001,,Missing,2024-03-30,2024-04-13,\n")
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(main(["import", "members", members, "--db", db]), 0)
+                # แถวที่อ้างถึงหนังสือที่ไม่มีอยู่ต้องถูกรายงานและได้ exit code 1
+                self.assertEqual(main(["import", "loans", loans, "--db", db]), 1)
+                self.assertEqual(main(["overdue", "--as-of", "2024-05-01", "--db", db]), 0)
+            self.assertIn("Missing", output.getvalue())
+            self.assertIn("No overdue loans.", output.getvalue())
+            # ไฟล์ที่ไม่รองรับหรือไม่มีอยู่ได้ข้อความใน stderr และ exit code ที่ไม่ใช่ 0 แทน traceback
+            errors = io.StringIO()
+            with contextlib.redirect_stderr(errors):
+                self.assertEqual(main(["import", "members", os.path.join(tmp, "x.txt"), "--db", db]), 2)
+                self.assertEqual(main(["import", "members", os.path.join(tmp, "missing.csv"), "--db", db]), 2)
+            self.assertIn("Unsupported file format", errors.getvalue())
+            library = Library(SQLiteStorage(db))
+            self.assertEqual(library.find_member("M001").name, "John Doe")
+            library.close()
+
+
+if __name__ == "__main__":
+    unittest.main()